@@ -0,0 +1,190 @@
+# benchmarks/bench_cleaning.py
+"""
+Time clean_database stage by stage, and every GET endpoint, at several scales.
+
+For each --scales value a fresh database is generated (generate_data.py),
+migrated and cleaned with clean_database(full=True). The seconds of every
+stage it reports are recorded: the vocabularies, begin, clean_names and
+delete_duplicates of every table (POKEMON_CLEAN_CHUNK_SIZE sets the name-pass
+chunk size), the read table rebuild and the single commit at the end. Then
+each endpoint is called --requests times through the SQL path and through
+the read index. Vocabularies come from the bundled
+snapshot (POKEAPI_OFFLINE=1), so runs are repeatable; the numbered names the
+generator adds past the snapshot's size are then corrected back to their base
+name. --generated-vocabulary cleans against the vocabulary generate_data.py
+writes instead, which keeps them, but every misspelt name is then matched
+against a vocabulary as large as the table (about 12 minutes at 100000 rows).
+
+    python benchmarks/bench_cleaning.py --scales 10000 100000 --json results.json
+    python benchmarks/bench_cleaning.py --baseline results.json   # exit 1 on regressions
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("POKEAPI_OFFLINE", "1")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import candidate_solution  # noqa: E402
+import pokeapi  # noqa: E402
+from candidate_solution import CleanProgress, clean_database, create_fastapi_app, migrate_database  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from generate_data import generate_database, vocabulary_file  # noqa: E402
+
+ENDPOINTS = {
+    "pokemon_by_ability": ("/pokemon/ability/{}", "abilities"),
+    "pokemon_by_type": ("/pokemon/type/{}", "types"),
+    "trainers_by_pokemon": ("/trainers/pokemon/{}", "pokemon"),
+    "abilities_by_pokemon": ("/abilities/pokemon/{}", "pokemon"),
+}
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return round(time.perf_counter() - start, 4)
+
+
+def bench_cleaning(conn: sqlite3.Connection):
+    """clean_database(conn, full=True) itself, with the elapsed seconds of every stage it reports."""
+    progress = CleanProgress()
+    if clean_database(conn, full=True, progress=progress) is None:
+        raise RuntimeError("clean_database failed; see the output above")
+    return {
+        table_name: {stage: counters["elapsed"] for stage, counters in stages.items()}
+        for table_name, stages in progress.report().items()
+    }
+
+
+def bench_endpoints(db_name: str, requests: int, rng: random.Random):
+    conn = sqlite3.connect(db_name)
+    samples = {
+        table: [row[0] for row in conn.execute(f"SELECT name FROM {table} ORDER BY RANDOM() LIMIT ?", (requests,))]
+        for table in ("pokemon", "types", "abilities")
+    }
+    conn.close()
+
+    results = {}
+    candidate_solution.DB_NAME = db_name
+    for path_name, use_read_cache in (("sql", False), ("read_index", True)):
+        app = create_fastapi_app(use_read_cache=use_read_cache)
+        with TestClient(app) as client:
+            if use_read_cache:
+                # startup only begins the load; time the index, not the SQL fallback
+                app.state.read_index.ensure_loaded(app.state.pool)
+            for endpoint, (path, table) in ENDPOINTS.items():
+                names = samples[table] or ["Missing"]
+                timings = []
+                for _ in range(requests):
+                    url = path.format(rng.choice(names))
+                    start = time.perf_counter()
+                    client.get(url)
+                    timings.append(time.perf_counter() - start)
+                timings.sort()
+                results.setdefault(endpoint, {})[path_name] = {
+                    "mean_ms": round(1000 * statistics.fmean(timings), 3),
+                    "p50_ms": round(1000 * timings[len(timings) // 2], 3),
+                    "p95_ms": round(1000 * timings[int(len(timings) * 0.95)], 3),
+                }
+    return results
+
+
+def bench_scale(rows: int, args, workdir: str):
+    db_name = os.path.join(workdir, f"bench_{rows}.db")
+    result = {"rows": rows}
+
+    start = time.perf_counter()
+    result["tables"] = generate_database(db_name, rows, args.seed)
+    result["generate_seconds"] = round(time.perf_counter() - start, 4)
+    if args.generated_vocabulary:
+        pokeapi.SNAPSHOT_FILE = vocabulary_file(db_name)
+
+    conn = sqlite3.connect(db_name)
+    result["migrate_seconds"] = timed(migrate_database, conn)
+    start = time.perf_counter()
+    result["stages"] = bench_cleaning(conn)
+    result["clean_seconds"] = round(time.perf_counter() - start, 4)
+    conn.close()
+
+    result["endpoints"] = bench_endpoints(db_name, args.requests, random.Random(args.seed))
+    if not args.keep:
+        os.remove(db_name)
+        os.remove(vocabulary_file(db_name))
+    return result
+
+
+def flatten(result: dict, prefix: str = ""):
+    """Yield ("a.b.c", seconds or ms) for every compared timing; p50/p95 are too noisy."""
+    for key, value in result.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f"{prefix}{key}.")
+        elif key.endswith(("_seconds", "mean_ms")) or prefix.startswith("stages."):
+            yield f"{prefix}{key}", value
+
+
+def regressions(results: dict, baseline: dict, tolerance: float, floor: float, floor_ms: float):
+    """Timings slower than the baseline by more than `tolerance` and by more than the floor."""
+    old = {(r["rows"], name): value for r in baseline["scales"] for name, value in flatten(r)}
+    found = []
+    for r in results["scales"]:
+        for name, value in flatten(r):
+            before = old.get((r["rows"], name))
+            unit_floor = floor_ms if name.endswith("_ms") else floor
+            if before is not None and value > before * (1 + tolerance) and value - before > unit_floor:
+                found.append(f"rows={r['rows']} {name}: {before} -> {value}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--requests", type=int, default=200, help="calls per endpoint and path")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workdir", help="where databases are generated (default: a temp dir)")
+    parser.add_argument("--keep", action="store_true", help="keep the generated databases")
+    parser.add_argument("--generated-vocabulary", action="store_true",
+                        help="clean against the generated vocabularies instead of the bundled snapshot")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare with an earlier --json file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, as a fraction")
+    parser.add_argument("--floor", type=float, default=0.05, help="ignore stage slowdowns below this many seconds")
+    parser.add_argument("--floor-ms", type=float, default=0.5, help="ignore endpoint slowdowns below this many ms")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bench_cleaning_")
+    results = {"seed": args.seed, "requests": args.requests,
+               "generated_vocabulary": args.generated_vocabulary, "scales": []}
+    for rows in args.scales:
+        result = bench_scale(rows, args, workdir)
+        results["scales"].append(result)
+
+        print(f"rows={rows} generate {result['generate_seconds']:.2f}s "
+              f"migrate {result['migrate_seconds']:.2f}s clean {result['clean_seconds']:.2f}s")
+        for table_name, stages in result["stages"].items():
+            if isinstance(stages, dict):
+                print(f"  {table_name:<10} " + "  ".join(f"{stage} {seconds:.3f}s" for stage, seconds in stages.items()))
+        for endpoint, paths in result["endpoints"].items():
+            print(f"  {endpoint:<22} " + "  ".join(
+                f"{path} mean {t['mean_ms']:.2f}ms p95 {t['p95_ms']:.2f}ms" for path, t in paths.items()))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance, args.floor, args.floor_ms)
+        for line in found:
+            print(f"REGRESSION {line}")
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
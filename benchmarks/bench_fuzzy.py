@@ -0,0 +1,122 @@
+# benchmarks/bench_fuzzy.py
+"""
+Compare the difflib spelling path in CleanPokemon with FuzzyMatcher.
+
+Builds a seeded synthetic vocabulary (same size as the PokeAPI ability list)
+and a column of dirty names drawn from it, runs both matchers over every row,
+checks that they return identical suggestions and prints the timings.
+
+    python benchmarks/bench_fuzzy.py --rows 20000 --vocabulary 1000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from difflib import get_close_matches
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fuzzy_match import FuzzyMatcher  # noqa: E402
+
+SYLLABLES = ["ba", "chu", "da", "ee", "fa", "gar", "ka", "lo", "mon", "ne", "pi",
+             "ra", "saur", "ta", "to", "vee", "wo", "xa", "ze", "zor"]
+
+
+def make_vocabulary(size: int, rng: random.Random):
+    words = set()
+    while len(words) < size:
+        word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if rng.random() < 0.2:
+            word += "-" + "".join(rng.choice(SYLLABLES) for _ in range(2))
+        words.add(word.title())
+    return sorted(words)
+
+
+def make_rows(vocabulary, count: int, rng: random.Random, typo_rate: float):
+    rows = []
+    for _ in range(count):
+        name = rng.choice(vocabulary)
+        if rng.random() < typo_rate:
+            chars = list(name)
+            position = rng.randrange(len(chars))
+            chars[position] = rng.choice("aeioutrs")
+            name = "".join(chars)
+        if rng.random() < 0.3:
+            name = name.upper() if rng.random() < 0.5 else name.lower()
+        rows.append(name)
+    return rows
+
+
+def run_difflib(rows, vocabulary):
+    return [get_close_matches(name.title(), vocabulary, n=1, cutoff=0.6) for name in rows]
+
+
+def run_matcher(rows, matcher):
+    return [matcher.get_close_matches(name.title(), n=1, cutoff=0.6) for name in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--vocabulary", type=int, default=1000)
+    parser.add_argument("--typo-rate", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(args.vocabulary, rng)
+    rows = make_rows(vocabulary, args.rows, rng, args.typo_rate)
+
+    start = time.perf_counter()
+    expected = run_difflib(rows, vocabulary)
+    difflib_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matcher = FuzzyMatcher(vocabulary, n=1, cutoff=0.6)
+    build_seconds = time.perf_counter() - start
+
+    # no memo: every row pays for a full indexed search
+    start = time.perf_counter()
+    uncached = run_matcher(rows, FuzzyMatcher(vocabulary, n=1, cutoff=0.6, cache_size=0))
+    uncached_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cached = run_matcher(rows, matcher)
+    cached_seconds = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(expected, uncached) if a != b)
+    mismatches += sum(1 for a, b in zip(expected, cached) if a != b)
+
+    results = {
+        "rows": args.rows,
+        "vocabulary": args.vocabulary,
+        "typo_rate": args.typo_rate,
+        "seed": args.seed,
+        "difflib_seconds": round(difflib_seconds, 4),
+        "index_build_seconds": round(build_seconds, 4),
+        "matcher_uncached_seconds": round(uncached_seconds, 4),
+        "matcher_seconds": round(cached_seconds, 4),
+        "memo_hits": matcher.hits,
+        "memo_misses": matcher.misses,
+        "mismatches": mismatches,
+    }
+
+    print(f"rows={args.rows} vocabulary={args.vocabulary} typo_rate={args.typo_rate}")
+    print(f"  difflib                 {difflib_seconds:8.3f}s")
+    print(f"  FuzzyMatcher (no memo)  {uncached_seconds:8.3f}s  x{difflib_seconds / uncached_seconds:.1f}")
+    print(f"  FuzzyMatcher            {cached_seconds:8.3f}s  x{difflib_seconds / cached_seconds:.1f}"
+          f"  (index build {build_seconds:.3f}s, memo hits {matcher.hits})")
+    print(f"  mismatches              {mismatches}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+# benchmarks/bench_load.py
+"""
+Throughput of `candidate_solution.py serve` as the worker count grows.
+
+A database is generated (generate_data.py), migrated and cleaned once. For
+each --workers value the server runs as a subprocess on it; --clients client
+processes then call the GET endpoints over keep-alive connections for
+--duration seconds, after --warmup seconds that are not counted. A
+--write-ratio share of the calls are POST /pokemon/bulk with a pokemon name
+not stored yet, so every one inserts rows and the writers of every worker
+compete for the database. Vocabularies come from the bundled snapshot
+(POKEAPI_OFFLINE=1) and the new pokemon from a local stub of PokeAPI
+(POKEAPI_BASE_URL), so nothing reaches the real PokeAPI and runs are repeatable. Speed-up is relative to the first
+--workers value; it cannot exceed the number of CPU cores, which is printed.
+
+    python benchmarks/bench_load.py --rows 10000 --workers 1 2 4 --json load.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import socket
+import sqlite3
+import statistics
+import string
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ.setdefault("POKEAPI_OFFLINE", "1")
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+import httpx  # noqa: E402
+
+import candidate_solution  # noqa: E402
+from generate_data import generate_database  # noqa: E402
+
+READ_PATHS = ("/pokemon/ability/{}", "/pokemon/type/{}", "/trainers/pokemon/{}", "/abilities/pokemon/{}")
+
+
+def prepare(db_name: str, rows: int, seed: int) -> dict:
+    """Generate and clean the database once; every server run starts from it."""
+    generate_database(db_name, rows, seed)
+    candidate_solution.DB_NAME = db_name
+    conn = candidate_solution.connect_db()
+    candidate_solution.migrate_database(conn)
+    candidate_solution.clean_database(conn)
+    samples = {
+        table: [row[0] for row in conn.execute(f"SELECT name FROM {table} ORDER BY RANDOM() LIMIT 200")]
+        for table in ("pokemon", "types", "abilities")
+    }
+    conn.close()
+    return samples
+
+
+def start_pokeapi_stub(samples: dict) -> ThreadingHTTPServer:
+    """GET /pokemon/<name> answers with types and abilities the database already knows."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            rng = random.Random(self.path)
+            types = rng.sample(samples["types"], 2)
+            abilities = rng.sample(samples["abilities"], 2)
+            body = json.dumps({
+                "name": self.path.rsplit("/", 1)[-1],
+                "types": [{"slot": slot, "type": {"name": name.lower()}} for slot, name in enumerate(types, 1)],
+                "abilities": [{"ability": {"name": name.lower()}, "is_hidden": False} for name in abilities],
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    stub = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    return stub
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(db_name: str, workers: int, port: int, workdir: str, pokeapi_url: str) -> subprocess.Popen:
+    env = dict(os.environ, POKEMON_DB=db_name, POKEAPI_BASE_URL=pokeapi_url)
+    log = open(os.path.join(workdir, f"server_{workers}.log"), "w")
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(REPO, "candidate_solution.py"), "serve",
+         "--workers", str(workers), "--port", str(port)],
+        cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with {server.returncode}; see {log.name}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"server did not start within 60s; see {log.name}")
+
+
+def stop_server(server: subprocess.Popen):
+    server.terminate()
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+def client(port: int, samples: dict, warmup: float, duration: float, write_ratio: float, seed: int):
+    """One client process: (read latencies, write latencies, errors) after the warm-up."""
+    rng = random.Random(seed)
+    reads, writes, errors = [], [], 0
+    names = {"/pokemon/ability/{}": samples["abilities"], "/pokemon/type/{}": samples["types"]}
+    start = time.perf_counter()
+    measure_from = start + warmup
+    stop = measure_from + duration
+    with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=30) as http:
+        while True:
+            now = time.perf_counter()
+            if now >= stop:
+                break
+            if rng.random() < write_ratio:
+                pokemon = "benchmon-" + "".join(rng.choice(string.ascii_lowercase) for _ in range(12))
+                trainer = "".join(rng.choice(string.ascii_letters) for _ in range(12))
+                r = http.post("/pokemon/bulk", json=[{"pokemon": pokemon, "trainer": trainer}])
+                latencies = writes
+            else:
+                path = rng.choice(READ_PATHS)
+                r = http.get(path.format(rng.choice(names.get(path, samples["pokemon"]))))
+                latencies = reads
+            elapsed = time.perf_counter() - now
+            if now >= measure_from:
+                latencies.append(elapsed)
+                # 404 is a valid answer for a name without rows; a write must add its pokemon
+                if r.status_code >= 500 or (latencies is writes and (r.status_code != 200 or r.json()["added"] != 1)):
+                    errors += 1
+    return reads, writes, errors
+
+
+def percentile(values, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def bench_workers(workers: int, args, db_name: str, samples: dict, workdir: str, pokeapi_url: str) -> dict:
+    port = free_port()
+    server = start_server(db_name, workers, port, workdir, pokeapi_url)
+    try:
+        with multiprocessing.Pool(args.clients) as pool:
+            results = pool.starmap(client, [
+                (port, samples, args.warmup, args.duration, args.write_ratio, args.seed + i)
+                for i in range(args.clients)
+            ])
+    finally:
+        stop_server(server)
+
+    reads = [latency for r, _, _ in results for latency in r]
+    writes = [latency for _, w, _ in results for latency in w]
+    return {
+        "workers": workers,
+        "requests_per_second": round((len(reads) + len(writes)) / args.duration, 1),
+        "reads": len(reads),
+        "writes": len(writes),
+        "errors": sum(e for _, _, e in results),
+        "read_mean_ms": round(1000 * statistics.fmean(reads), 3) if reads else None,
+        "read_p99_ms": round(1000 * percentile(reads, 0.99), 3),
+        "write_mean_ms": round(1000 * statistics.fmean(writes), 3) if writes else None,
+        "write_p99_ms": round(1000 * percentile(writes, 0.99), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=8, help="client processes")
+    parser.add_argument("--duration", type=float, default=10, help="measured seconds per worker count")
+    parser.add_argument("--warmup", type=float, default=3, help="unmeasured seconds before that")
+    parser.add_argument("--write-ratio", type=float, default=0.05, help="share of calls that write")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workdir", help="where the database and server logs go (default: a temp dir)")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bench_load_")
+    os.makedirs(workdir, exist_ok=True)
+    db_name = os.path.join(workdir, "bench_load.db")
+    samples = prepare(db_name, args.rows, args.seed)
+    # every worker count starts from the same data
+    pristine = os.path.join(workdir, "pristine.db")
+    with sqlite3.connect(db_name) as source, sqlite3.connect(pristine) as target:
+        source.backup(target)
+
+    stub = start_pokeapi_stub(samples)
+    pokeapi_url = f"http://127.0.0.1:{stub.server_address[1]}"
+    results = {"rows": args.rows, "clients": args.clients, "cpus": os.cpu_count(), "runs": []}
+    print(f"rows={args.rows} clients={args.clients} cpus={os.cpu_count()} duration={args.duration}s")
+    for workers in args.workers:
+        with sqlite3.connect(pristine) as source, sqlite3.connect(db_name) as target:
+            source.backup(target)
+        run = bench_workers(workers, args, db_name, samples, workdir, pokeapi_url)
+        run["speedup"] = round(run["requests_per_second"] / results["runs"][0]["requests_per_second"], 2) \
+            if results["runs"] else 1.0
+        results["runs"].append(run)
+        print(f"  workers={workers:<3} {run['requests_per_second']:>8} req/s  x{run['speedup']:<5} "
+              f"read mean {run['read_mean_ms']}ms p99 {run['read_p99_ms']}ms  "
+              f"write mean {run['write_mean_ms']}ms p99 {run['write_p99_ms']}ms  errors {run['errors']}")
+
+    stub.shutdown()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 1 if any(run["errors"] for run in results["runs"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,34 +1,236 @@
 # candidate_solution.py
 import sqlite3
 import os
-from fastapi import FastAPI, HTTPException, Path
-from typing import List, Optional
-import uvicorn
-import httpx
+import sys
+import time
+import json
+import hashlib
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from typing import TYPE_CHECKING, List, Literal, Optional
 import asyncio
+try:
+    import fcntl
+except ImportError:  # Windows: busy_timeout alone keeps writers apart there
+    fcntl = None
 from difflib import get_close_matches
+from fuzzy_match import FuzzyMatcher
+from migrations import apply_migrations, check_query_plans
+from read_tables import pause_read_tables, read_tables_live, rebuild_read_tables, refresh_read_tables
+from search import search_names
+import metrics
+from http_cache import ConditionalGetMiddleware, DataVersion, bump_data_version
+from pokeapi import (POKEAPI_BASE_URL, POKEAPI_TIMEOUT, PokeAPIClient, PokemonDataCache, load_vocabularies,
+                     parse_pokemon_data)
+
+# fastapi, pydantic, uvicorn and httpx are imported where they are used, so
+# `python candidate_solution.py clean` starts without them
+if TYPE_CHECKING:
+    from fastapi import FastAPI
 
 # --- Constants ---
-DB_NAME = "pokemon_assessment.db"
+DB_NAME = os.environ.get("POKEMON_DB", "pokemon_assessment.db")
+# seconds a connection waits for another process's lock before "database is locked"
+BUSY_TIMEOUT = float(os.environ.get("POKEMON_BUSY_TIMEOUT", "5"))
+# seconds an insert waits for another process's writer (a clean) before the request gets a 503
+WRITE_LOCK_TIMEOUT = float(os.environ.get("POKEMON_WRITE_LOCK_TIMEOUT", "1"))
+# WAL lets readers in every worker run alongside the one writer
+JOURNAL_MODE = os.environ.get("POKEMON_JOURNAL_MODE", "wal")
+WORKERS = int(os.environ.get("POKEMON_WORKERS", "1"))
+POOL_SIZE = int(os.environ.get("POKEMON_DB_POOL_SIZE", "5"))
+POOL_TIMEOUT = float(os.environ.get("POKEMON_DB_POOL_TIMEOUT", "5"))
+READ_CACHE_ENABLED = os.environ.get("POKEMON_READ_CACHE", "1") != "0"
+BULK_MAX_ITEMS = int(os.environ.get("POKEMON_BULK_MAX_ITEMS", "500"))
+METRICS_ENABLED = os.environ.get("POKEMON_METRICS", "1") != "0"
+MAX_PAGE_SIZE = int(os.environ.get("POKEMON_MAX_PAGE_SIZE", "1000"))
+SEARCH_MAX_LIMIT = int(os.environ.get("POKEMON_SEARCH_MAX_LIMIT", "100"))
+STREAM_BATCH_SIZE = int(os.environ.get("POKEMON_STREAM_BATCH_SIZE", "500"))
+CACHE_CONTROL = os.environ.get("POKEMON_CACHE_CONTROL", "no-cache")
+SNAPSHOT_READS = os.environ.get("POKEMON_SNAPSHOT_READS", "0") == "1"
+SNAPSHOT_POLL_INTERVAL = float(os.environ.get("POKEMON_SNAPSHOT_POLL_INTERVAL", "1"))
+WRITE_QUEUE_SIZE = int(os.environ.get("POKEMON_WRITE_QUEUE_SIZE", "1000"))
+WRITE_BATCH_SIZE = int(os.environ.get("POKEMON_WRITE_BATCH_SIZE", "1000"))
+CLEAN_CHUNK_SIZE = int(os.environ.get("POKEMON_CLEAN_CHUNK_SIZE", "5000"))
+# /admin/* has no authentication: only turn it on where every client is trusted
+ADMIN_ENABLED = os.environ.get("POKEMON_ADMIN", "0") == "1"
+CLEAN_JOB_HISTORY = int(os.environ.get("POKEMON_CLEAN_JOB_HISTORY", "20"))
 pokemon_pokemon     = [] 
 pokemon_types       = []
 pokemon_abilities   = []
 
 
+# table -> (referencing table, column, what happens when the row is gone)
+REFERENCES = {
+    "pokemon": [("trainer_pokemon_abilities", "pokemon_id", "cascade")],
+    "types": [("pokemon", "type1_id", "set null"), ("pokemon", "type2_id", "set null")],
+    "abilities": [("trainer_pokemon_abilities", "ability_id", "cascade")],
+    "trainers": [("trainer_pokemon_abilities", "trainer_id", "cascade")],
+}
+TPA_COLUMNS = {"pokemon": "pokemon_id", "abilities": "ability_id", "trainers": "trainer_id"}
+
+# Every change a cleaning run makes, in order: delete, rename, merge (new_value
+# is the id it was merged into) or set null. Reported by a dry run.
+CLEAN_PLAN_SCHEMA = """
+    CREATE TEMP TABLE IF NOT EXISTS clean_plan (
+        step INTEGER PRIMARY KEY,
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        action TEXT NOT NULL,
+        old_value,
+        new_value,
+        reason TEXT NOT NULL
+    )"""
+CLEAN_PLAN_SYMBOLS = {"delete": "-", "rename": "~", "merge": ">", "set null": "~"}
+
+
+class CleanCancelled(Exception):
+    """Raised inside a cleaning run whose CleanProgress was cancelled."""
+
+
+class CleanProgress:
+    """
+    Live counters of a cleaning run: per table and stage its state, rows
+    scanned, rows changed and elapsed seconds. Other threads read it with
+    `report` while the run updates it; `cancel` stops the run at its next check.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._current = None
+        self._stages = {}
+
+    @contextmanager
+    def stage(self, table_name: str, stage: str):
+        self.check()
+        counters = {"state": "running", "rows_scanned": 0, "rows_changed": 0, "elapsed": 0.0}
+        with self._lock:
+            self._stages.setdefault(table_name, {})[stage] = counters
+            self._current = counters
+        start = time.perf_counter()
+        state = "failed"
+        try:
+            yield counters
+            state = "done"
+        finally:
+            with self._lock:
+                # a stage that reported its own failure keeps it
+                if counters["state"] == "running":
+                    counters["state"] = "cancelled" if state == "failed" and self.cancelled else state
+                counters["elapsed"] = round(time.perf_counter() - start, 3)
+                self._current = None
+
+    def add(self, scanned: int = 0, changed: int = 0):
+        """Count rows for the running stage, then honour a cancel."""
+        with self._lock:
+            if self._current is not None:
+                self._current["rows_scanned"] += scanned
+                self._current["rows_changed"] += changed
+        self.check()
+
+    def abort(self):
+        """Mark the running stage failed, or cancelled when a cancel is why it stopped."""
+        with self._lock:
+            if self._current is not None:
+                self._current["state"] = "cancelled" if self.cancelled else "failed"
+
+    def check(self):
+        if self._cancelled.is_set():
+            raise CleanCancelled("Cleaning cancelled")
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def report(self) -> dict:
+        with self._lock:
+            return {table_name: {stage: dict(counters) for stage, counters in stages.items()}
+                    for table_name, stages in self._stages.items()}
+
+
 class CleanPokemon:
     
-    def __init__(self, table_name ,conn: sqlite3.Connection):
+    def __init__(self, table_name ,conn: sqlite3.Connection, full: bool = True, chunk_size: int = CLEAN_CHUNK_SIZE,
+                 progress: Optional[CleanProgress] = None):
         
         self.table_name = table_name
         self.conn = conn
         self.cursor = conn.cursor()
+        self.rows_changed = 0   # rows written by the last rename pass
+        self.rows_deleted = 0   # rows removed by the last name pass
+        # full=False limits every pass to the rows in temp.clean_batch (see begin)
+        self.full = full
+        # rows held in memory at once by the name passes
+        self.chunk_size = chunk_size
+        # rows scanned and changed are counted into the running stage
+        self.progress = progress if progress is not None else CleanProgress()
        
-    def __del__(self):
-        self.conn.commit()
+    # Take this pass's rows: those marked in clean_dirty, or every row when full.
+    # Returns how many rows (plus possibly unused ones to prune) the pass covers
+    def begin(self) -> int:
+        self.cursor.execute("CREATE TEMP TABLE IF NOT EXISTS clean_batch (row_id INTEGER PRIMARY KEY)")
+        self.cursor.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS clean_orphans (
+                table_name TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                PRIMARY KEY (table_name, row_id)
+            )""")
+        self.cursor.execute(CLEAN_PLAN_SCHEMA)
+        self.cursor.execute("DELETE FROM temp.clean_batch")
+        if self.full:
+            self.cursor.execute(f"INSERT INTO temp.clean_batch SELECT id FROM {self.table_name}")
+        else:
+            self.cursor.execute(
+                "INSERT INTO temp.clean_batch SELECT row_id FROM clean_dirty WHERE table_name = ?",
+                (self.table_name,))
+        return self.conn.execute("""
+            SELECT (SELECT COUNT(*) FROM temp.clean_batch)
+                 + (SELECT COUNT(*) FROM temp.clean_orphans WHERE table_name = ?)
+            """, (self.table_name,)).fetchone()[0]
+
+    # Rows cleaned by this pass are no longer dirty; rows marked meanwhile stay
+    def finish(self):
+        self.cursor.execute("""
+            DELETE FROM clean_dirty
+            WHERE table_name = ? AND row_id IN (SELECT row_id FROM temp.clean_batch)
+            """, (self.table_name,))
+        self.cursor.execute("DELETE FROM temp.clean_orphans WHERE table_name = ?", (self.table_name,))
+
+    # SQL filter restricting a statement to this pass's rows
+    def _scope(self, column: str = "id") -> str:
+        if self.full:
+            return ""
+        return f"AND {column} IN (SELECT row_id FROM temp.clean_batch)"
+
+    # Roster rows about to be deleted may leave abilities or trainers unused;
+    # an incremental run remembers them so the later passes prune them
+    # (a full run prunes every unused row anyway)
+    def _delete_roster_rows(self, where: str, reason: str):
+        if not self.full:
+            for table_name, column in TPA_COLUMNS.items():
+                self.cursor.execute(f"""
+                    INSERT OR IGNORE INTO temp.clean_orphans (table_name, row_id)
+                    SELECT '{table_name}', {column} FROM trainer_pokemon_abilities WHERE {where} """)
+        self.cursor.execute(f"""
+            INSERT INTO temp.clean_plan (table_name, row_id, action, old_value, reason)
+            SELECT 'trainer_pokemon_abilities', id, 'delete',
+                'pokemon ' || pokemon_id || ', trainer ' || trainer_id || ', ability ' || ability_id, ?
+            FROM trainer_pokemon_abilities WHERE {where} """, (reason,))
+        self.cursor.execute(f"DELETE FROM trainer_pokemon_abilities WHERE {where}")
 
     # get Spelling Suggestion
+    # pokemon_list is either a FuzzyMatcher built once per vocabulary
+    # or a plain list, which falls back to a full difflib scan
     def get_spelling_suggestion(self,name: str , pokemon_list):
-    
+
+        if isinstance(pokemon_list, FuzzyMatcher):
+            return pokemon_list.get_close_matches(name.title(), n=1, cutoff=0.6)
+
         return get_close_matches(
             name.title(),
             pokemon_list,
@@ -36,20 +238,121 @@ class CleanPokemon:
             cutoff=0.6    # similarity threshold
         )
     
+    # --- Name passes ---
+    # Junk removal, spelling and case only ever look at one row, so they run
+    # as generator stages over id-ordered chunks of (id, original name, name)
+    # rows; a name of None means delete. Memory is bounded by chunk_size,
+    # whatever the size of the table.
+
+    # This pass's (id, name) rows, chunk_size at a time. Keyset paging: each
+    # chunk is read in full before it is written, so no cursor stays open
+    # across the writes
+    def _chunks(self):
+        if self.full:
+            sql = f"""
+                SELECT id, name FROM {self.table_name}
+                WHERE id > ?
+                ORDER BY id
+                LIMIT ? """
+        else:
+            # walk the batch, not the table, so every chunk is one range seek
+            sql = f"""
+                SELECT t.id, t.name FROM temp.clean_batch b
+                    INNER JOIN {self.table_name} t ON t.id = b.row_id
+                WHERE b.row_id > ?
+                ORDER BY b.row_id
+                LIMIT ? """
+        last_id = -1
+        while True:
+            rows = self.conn.execute(sql, (last_id, self.chunk_size)).fetchall()
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1][0]
+
+    # Remove Redundant Data: '', '---', '???' (spaces trimmed) and anything
+    # containing 'remove' in any case, only because Abilites has a Remove this ability Record
+    @staticmethod
+    def _drop_junk(rows):
+        for id_value, original, name in rows:
+            if name is not None and (name.strip(" ") in ("", "---", "???") or "remove" in name.lower()):
+                name = None
+            yield id_value, original, name
+
+    def _correct_spelling(self, rows, list_name):
+        for id_value, original, name in rows:
+            if name is not None:
+                #retrieving  Supposed  Correct  Spelling  
+                suggestion = self.get_spelling_suggestion(name, list_name)
+                if suggestion:
+                    name = suggestion[0]
+            yield id_value, original, name
+
+    @staticmethod
+    def _title_case(rows):
+        for id_value, original, name in rows:
+            yield id_value, original, name.title() if name is not None else None
+
+    # Push every chunk through `stages` and write its deletes and renames in
+    # one executemany each; only rows whose name actually changes are written
+    def _run_stages(self, *stages):
+        self.rows_changed = 0
+        self.rows_deleted = 0
+        for chunk in self._chunks():
+            rows = ((id_value, name, name) for id_value, name in chunk)
+            for stage in stages:
+                rows = stage(rows)
+            deletes = []
+            renames = []
+            plan = []
+            for id_value, original, name in rows:
+                if name is None:
+                    deletes.append((id_value,))
+                    plan.append((id_value, "delete", original, None, "junk"))
+                elif name != original:
+                    renames.append((name, id_value))
+                    plan.append((id_value, "rename", original, name,
+                                 "case" if name == original.title() else "spelling"))
+            self.cursor.executemany(f"DELETE FROM {self.table_name} WHERE id = ?", deletes)
+            self.cursor.executemany(f"UPDATE {self.table_name} SET name = ? WHERE id = ?", renames)
+            self.cursor.executemany(f"""
+                INSERT INTO temp.clean_plan (table_name, row_id, action, old_value, new_value, reason)
+                VALUES ('{self.table_name}', ?, ?, ?, ?, ?) """, plan)
+            self.rows_deleted += len(deletes)
+            self.rows_changed += len(renames)
+            self.progress.add(len(chunk), len(deletes) + len(renames))
+
+    def clean_names(self, list_name=None):
+        """
+        Remove -> spell-correct -> case in a single chunked pass, the same
+        result as running remove_redundant_data, correct_spelling and
+        standardise_case one after the other. list_name=None skips the
+        spelling stage (trainers have no reference list).
+        """
+        print("Start clean_names ", self.table_name)
+        stages = [self._drop_junk]
+        if list_name is not None:
+            if not isinstance(list_name, FuzzyMatcher):
+                list_name = FuzzyMatcher(list_name, n=1, cutoff=0.6)
+            stages.append(lambda rows: self._correct_spelling(rows, list_name))
+        stages.append(self._title_case)
+
+        try:
+            self._run_stages(*stages)
+        except sqlite3.Error as e:
+            print(f"An error occurred cleaning names {self.table_name}: {e}")
+            self.conn.rollback()
+            return False
+
+        print(f"End clean_names  {self.rows_deleted} rows removed, {self.rows_changed} rows renamed")
+        return True
+
     # Remove Redundant Data 
     def remove_redundant_data(self): 
 
         print("Start remove_redundant_data ", self.table_name )
-        sql = f"""
-            DELETE FROM {self.table_name}
-            WHERE TRIM(name) = ''
-            OR TRIM(name) = '---'
-            OR TRIM(name) = '???'
-            OR name like '%Remove%' 
-            """
-        # OR name like '%Remove%'   only because  Abilites has a Remove this ability Record
         try: 
-            self.cursor.execute(sql)
+            self._run_stages(self._drop_junk)
             
         except sqlite3.Error as e:
             print(f"An error occurred during remove Redundant data pokemon: {e}")
@@ -58,183 +361,130 @@ class CleanPokemon:
 
         print("end remove_redundant_data ")
         return True
+
     # Correct Spelling 
     def correct_spelling(self , list_name):
 
         print("Start  correct_spelling ", self.table_name )
   
-        sql = f"""
-            SELECT id , name  FROM {self.table_name}
-            """
-        try:
-            self.cursor.execute(sql)
-            names_ids = self.cursor.fetchall()
-            for name_id in names_ids:            
-                id_value = name_id[0]  
-                name_value = name_id[1]
+        if not isinstance(list_name, FuzzyMatcher):
+            list_name = FuzzyMatcher(list_name, n=1, cutoff=0.6)
 
-                #retrieving  Supposed  Correct  Spelling  
-                table_name = self.get_spelling_suggestion(name_value , list_name)
-                
-                if table_name:
-                    table_name = table_name[0]
-                else : 
-                    table_name = name_value
-
-                # update the  Spelling of the names 
-                if table_name !=  name_value :
-                    sql_update =f"UPDATE {self.table_name} SET name = ? WHERE id = ?"
-                    self.cursor.execute(sql_update, (table_name, id_value))
+        try:
+            self._run_stages(lambda rows: self._correct_spelling(rows, list_name))
                     
         except sqlite3.Error as e:
             self.conn.rollback()
             print(f"An error occurred during Spelling Fix cleaning {self.table_name}: {e}")
             return False
 
-        print("End  correct_misspellings ")
+        print(f"End  correct_misspellings  {self.rows_changed} rows updated")
         return True   
     
     def standardise_case(self): 
         print("Start Standardise Case  ",self.table_name )
         
-        sql_select = f"""
-            SELECT id , name  FROM {self.table_name}
-            """
-        
         try: 
-            self.cursor.execute(sql_select)
-            names_ids = self.cursor.fetchall()
-            for name_id in names_ids:
-                id_value = name_id[0]    # id is the first column
-                name_value = name_id[1] 
-                titlecase = name_value.title()
-
-                try: 
-                    #update table
-                    sql_update =f"UPDATE {self.table_name} SET name = ? WHERE id = ?"
-                    self.cursor.execute(sql_update, (titlecase, id_value))
-                    
-                except sqlite3.Error as e:
-                    print(f"An error occurred Updating Case pokemons: {e}")
-                    self.conn.rollback()
-                    return False
+            self._run_stages(self._title_case)
+
         except sqlite3.Error as e:
-            print(f"An error occurred table pokemon Selection : {e}")
+            print(f"An error occurred Updating Case {self.table_name}: {e}")
             self.conn.rollback()
             return False
         
-        self.conn.commit()
-        print("End Standardise Case")
+        print(f"End Standardise Case  {self.rows_changed} rows updated")
         return True   
         
     # Delete Duplicates
     def delete_duplicates(self):
-        
+        """
+        Collapse rows whose names differ only by case onto the lowest id.
+        A duplicate -> canonical id map is built once in temp.dedupe_map, every
+        column in REFERENCES is rewritten with one UPDATE ... FROM, and only
+        then are the duplicates deleted, so no reference is left dangling.
+        """
         print("Start Deleting Duplicates ", self.table_name)
 
-        # Pokemon Deletes
-        if self.table_name == "pokemon" :
-            sql = f"""
-            DELETE FROM {self.table_name}
-            WHERE id NOT IN (
-                SELECT MIN(id)
-                FROM {self.table_name}
-                WHERE id in (
-                    SELECT pokemon_id FROM 
-                    trainer_pokemon_abilities
-                    group by pokemon_id
+        try:
+            self.cursor.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS dedupe_map (
+                    duplicate_id INTEGER PRIMARY KEY,
+                    canonical_id INTEGER NOT NULL
+                )""")
+            self.cursor.execute("DELETE FROM temp.dedupe_map")
+            # only names shared with a row of this pass can have new duplicates
+            scope = "" if self.full else f"""
+                WHERE LOWER(name) IN (
+                    SELECT LOWER(name) FROM {self.table_name} WHERE 1 {self._scope()}
+                )"""
+            self.cursor.execute(f"""
+                INSERT INTO temp.dedupe_map (duplicate_id, canonical_id)
+                SELECT id, canonical_id FROM (
+                    SELECT id, MIN(id) OVER (PARTITION BY LOWER(name)) AS canonical_id
+                    FROM {self.table_name} {scope}
                 )
-            GROUP BY LOWER(name)
-            )
-            """
-            
-        # Abilities deletes
-        if self.table_name == "abilities" :
-            sql = f"""
+                WHERE id != canonical_id """)
+            self.cursor.execute(f"""
+                INSERT INTO temp.clean_plan (table_name, row_id, action, old_value, new_value, reason)
+                SELECT '{self.table_name}', m.duplicate_id, 'merge', d.name, m.canonical_id, 'duplicate'
+                FROM temp.dedupe_map m INNER JOIN {self.table_name} d ON d.id = m.duplicate_id """)
+
+            for table_name, column, _ in REFERENCES.get(self.table_name, []):
+                self.cursor.execute(f"""
+                    UPDATE {table_name} SET {column} = m.canonical_id
+                    FROM temp.dedupe_map m
+                    WHERE {table_name}.{column} = m.duplicate_id """)
+
+            self.cursor.execute(f"""
                 DELETE FROM {self.table_name}
-                WHERE id NOT IN (
-                    SELECT MIN(id)
-                    FROM {self.table_name}
-                    WHERE id in (
-                        SELECT ability_id FROM 
-                        trainer_pokemon_abilities
-                        group by ability_id 
-                    )
-                GROUP BY LOWER(name)
-                )
-                """
+                WHERE id IN (SELECT duplicate_id FROM temp.dedupe_map) """)
+
+            # Rows no roster entry uses are dropped, as before
+            if self.table_name in TPA_COLUMNS:
+                column = TPA_COLUMNS[self.table_name]
+                scope = "" if self.full else f"""
+                    AND (id IN (SELECT row_id FROM temp.clean_batch)
+                    OR id IN (SELECT row_id FROM temp.clean_orphans WHERE table_name = '{self.table_name}'))"""
+                where = f"id NOT IN (SELECT {column} FROM trainer_pokemon_abilities) {scope}"
+                self.cursor.execute(f"""
+                    INSERT INTO temp.clean_plan (table_name, row_id, action, old_value, reason)
+                    SELECT '{self.table_name}', id, 'delete', name, 'unused' FROM {self.table_name} WHERE {where} """)
+                self.cursor.execute(f"DELETE FROM {self.table_name} WHERE {where}")
+
+            # References to rows removed earlier (e.g. '???' names) are cleared
+            for table_name, column, on_delete in REFERENCES.get(self.table_name, []):
+                where = f"""{column} IS NOT NULL {self._scope(column)}
+                    AND {column} NOT IN (SELECT id FROM {self.table_name})"""
+                if on_delete == "cascade":
+                    self._delete_roster_rows(where, f"missing {column}")
+                else:
+                    self.cursor.execute(f"""
+                        INSERT INTO temp.clean_plan (table_name, row_id, action, old_value, reason)
+                        SELECT '{table_name}', id, 'set null', '{column} ' || {column}, 'missing {column}'
+                        FROM {table_name} WHERE {where} """)
+                    self.cursor.execute(f"UPDATE {table_name} SET {column} = NULL WHERE {where}")
+
+            # Remapping can turn two roster rows into the same row
+            if self.table_name in TPA_COLUMNS:
+                column = TPA_COLUMNS[self.table_name]
+                scope = "" if self.full else f"WHERE {column} IN (SELECT canonical_id FROM temp.dedupe_map)"
+                self._delete_roster_rows(f"""
+                    id IN (
+                        SELECT id FROM trainer_pokemon_abilities {scope}
+                        EXCEPT
+                        SELECT MIN(id) FROM trainer_pokemon_abilities {scope}
+                        GROUP BY pokemon_id, trainer_id, ability_id
+                    )""", "duplicate roster row")
+
+            self.rows_changed = self.conn.execute("SELECT COUNT(*) FROM temp.dedupe_map").fetchone()[0]
+            self.cursor.execute("DELETE FROM temp.dedupe_map")
 
-        # Trainers deletion
-        if self.table_name == "trainers" :
-            sql = f"""
-                DELETE FROM {self.table_name}
-                WHERE id NOT IN (
-                    SELECT MIN(id)
-                    FROM {self.table_name}
-                    WHERE id in (
-                        SELECT trainer_id FROM 
-                        trainer_pokemon_abilities
-                        group by trainer_id 
-                    )
-                GROUP BY LOWER(name)
-                )
-                """
-            
-        # Fixing types mapping    
-        if self.table_name == "types" :
-            
-            #We need to  first  fix the  mapping  for types 
-            #before we can delete Duplicates
-            sql = f"""
-                SELECT d.id AS duplicate_id, m.min_id
-                    FROM {self.table_name} d
-                    JOIN (
-                        SELECT LOWER(name) AS lname, MIN(id) AS min_id
-                        FROM {self.table_name}
-                        GROUP BY LOWER(name)
-                    ) m
-                    ON LOWER(d.name) = m.lname
-                    WHERE d.id != m.min_id;
-                """
-            
-            try:
-                self.cursor.execute(sql)
-                type_ids = self.cursor.fetchall()
-                for duplicate_id, min_id in type_ids:    
-                    sql = """
-                    UPDATE pokemon
-                    SET
-                        type1_id = CASE WHEN type1_id = ? THEN ? ELSE type1_id END,
-                        type2_id = CASE WHEN type2_id = ? THEN ? ELSE type2_id END
-                    """
-                    self.cursor.execute(sql, (duplicate_id, min_id, duplicate_id, min_id))
-        
-            except sqlite3.Error as e:
-                print(f"An error occurred during database cleaning {self.table_name}: {e}")
-                self.conn.rollback()
-                return False
-    
-            #now  we Can Delete Duplicates
-            sql = f"""
-            DELETE FROM {self.table_name}
-            WHERE id NOT IN (
-                SELECT MIN(id)
-                FROM {self.table_name}
-                GROUP BY LOWER(name)
-            )
-            """
-        # And  now we can Delete the Dullicates from the tables 
-        
-        try:
-            self.cursor.execute(sql)
-            self.conn.commit()
-            
         except sqlite3.Error as e:
             print(f"An error occurred during database cleaning {self.table_name}: {e}")
             self.conn.rollback()
             return False
 
-        print("End Deleting Duplicates")
+        print(f"End Deleting Duplicates  {self.rows_changed} duplicates merged")
         return True 
 
 
@@ -255,7 +505,7 @@ def connect_db() -> Optional[sqlite3.Connection]:
     try:
         # --- Implement Here ---
         
-        connection = sqlite3.connect(DB_NAME) # My SQLLite Connection
+        connection = sqlite3.connect(DB_NAME, timeout=BUSY_TIMEOUT) # My SQLLite Connection
         
         # --- End Implementation ---
     except sqlite3.Error as e:
@@ -264,79 +514,828 @@ def connect_db() -> Optional[sqlite3.Connection]:
 
     return connection
 
+
+# --- Connection Pool ---
+class ConnectionPool:
+    """
+    Fixed-size pool of SQLite connections shared by the API endpoints.
+    Connections are opened lazily, health checked on checkout and handed
+    back by `connection()` even when the request raises.
+    """
+
+    def __init__(self, db_name: str = DB_NAME, size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT,
+                 factory=sqlite3.Connection):
+        if size < 1:
+            raise ValueError("Connection pool size must be at least 1")
+
+        self.db_name = db_name
+        self.size = size
+        self.timeout = timeout
+        self.factory = factory
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._closed = False
+
+    def _open(self) -> sqlite3.Connection:
+        if not os.path.exists(self.db_name):
+            raise sqlite3.OperationalError(f"Database file '{self.db_name}' not found")
+        # Connections move between the worker threads serving requests
+        return sqlite3.connect(self.db_name, timeout=BUSY_TIMEOUT, check_same_thread=False, factory=self.factory)
+
+    @staticmethod
+    def _is_healthy(conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+        except sqlite3.Error:
+            return False
+        return True
+
+    def _reserve_slot(self) -> bool:
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                return True
+        return False
+
+    def _release_slot(self):
+        with self._lock:
+            self._opened -= 1
+
+    def acquire(self) -> sqlite3.Connection:
+        """Check a connection out of the pool, opening one if the pool is not full."""
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection pool is closed")
+
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            if self._reserve_slot():
+                conn = None
+            else:
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise sqlite3.OperationalError("Timed out waiting for a pooled database connection")
+
+        # Replace connections that went bad while idle, keeping their slot
+        if conn is not None and not self._is_healthy(conn):
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+            conn = None
+
+        if conn is None:
+            try:
+                conn = self._open()
+            except sqlite3.Error:
+                self._release_slot()
+                raise
+        return conn
+
+    def release(self, conn: sqlite3.Connection):
+        """Return a connection to the pool, rolling back anything left open."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            self._release_slot()
+            return
+
+        if self._closed:
+            conn.close()
+            self._release_slot()
+            return
+        self._idle.put_nowait(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Close every idle connection; checked out ones are closed on release."""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            self._release_slot()
+
+
+# --- Read Index ---
+class ReadIndex:
+    """
+    In-process lookup tables backing the GET endpoints:
+    ability -> pokemon, type -> pokemon, pokemon -> trainers and pokemon -> abilities.
+    Loaded once from the database, kept current by `add_pokemon` and
+    invalidated after a cleaning run. Loads run in the background (see
+    `ready`); until one finishes the endpoints read SQLite instead.
+    Each process holds its own copy, which `ready` reloads when
+    app_meta.data_version shows a write (another worker, a CLI clean).
+    Types and abilities are keyed case-insensitively like their NOCASE columns.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._generation = 0
+        self._loader = None
+        self._version = None
+        # data_version of a WriteQueue commit whose write-through has not landed yet
+        self._pending = None
+        self.ability_pokemon = {}
+        self.type_pokemon = {}
+        self.pokemon_trainers = {}
+        self.pokemon_abilities = {}
+
+    def load(self, conn: sqlite3.Connection):
+        with self._lock:
+            generation = self._generation
+        # read first: a write during the load shows up as a newer version
+        version = conn.execute("SELECT value FROM app_meta WHERE key = 'data_version'").fetchone()
+
+        ability_pokemon = {}
+        type_pokemon = {}
+        pokemon_trainers = {}
+        pokemon_abilities = {}
+
+        sql = """
+            SELECT ab.name, pk.name FROM trainer_pokemon_abilities tpa
+                inner join pokemon pk on pk.id = tpa.pokemon_id
+                inner join abilities ab on ab.id = tpa.ability_id
+            ORDER BY tpa.id """
+        for ability_name, pokemon_name in conn.execute(sql):
+            ability_pokemon.setdefault(ability_name.lower(), []).append(pokemon_name)
+            pokemon_abilities.setdefault(pokemon_name, []).append(ability_name)
+
+        sql = """
+            SELECT pk.name, tr.name FROM trainer_pokemon_abilities tpa
+                inner join pokemon pk on pk.id = tpa.pokemon_id
+                inner join trainers tr on tr.id = tpa.trainer_id
+            GROUP BY pk.name, tr.name
+            ORDER BY MIN(tpa.id) """
+        for pokemon_name, trainer_name in conn.execute(sql):
+            pokemon_trainers.setdefault(pokemon_name, []).append(trainer_name)
+
+        sql = """
+            SELECT pk.name, t1.name, t2.name FROM pokemon pk
+                LEFT JOIN types t1 ON pk.type1_id = t1.id
+                LEFT JOIN types t2 ON pk.type2_id = t2.id
+            ORDER BY pk.id """
+        for pokemon_name, type1, type2 in conn.execute(sql):
+            self._add_types(type_pokemon, pokemon_name, type1, type2)
+
+        with self._lock:
+            self.ability_pokemon = ability_pokemon
+            self.type_pokemon = type_pokemon
+            self.pokemon_trainers = pokemon_trainers
+            self.pokemon_abilities = pokemon_abilities
+            self._version = version[0] if version else None
+            # a write or invalidation during the load means these rows may be stale
+            self._loaded = self._generation == generation
+        print(f"Read index loaded: {len(pokemon_abilities)} pokemon with abilities, {len(type_pokemon)} types")
+
+    @staticmethod
+    def _add_types(type_pokemon: dict, pokemon_name: str, type1: Optional[str], type2: Optional[str]):
+        # a pokemon is listed once per type, even if both slots hold the same type
+        keys = {t.lower() for t in (type1, type2) if t}
+        for key in keys:
+            type_pokemon.setdefault(key, []).append(pokemon_name)
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._loaded = False
+
+    def ensure_loaded(self, pool: ConnectionPool):
+        if self._loaded:
+            return
+        with pool.connection() as conn:
+            self.load(conn)
+
+    def _load_in_background(self, pool: ConnectionPool):
+        try:
+            self.ensure_loaded(pool)
+        except sqlite3.Error as e:
+            # the next `ready` call tries again
+            print(f"Read index could not be loaded: {e}")
+
+    def ready(self, pool: ConnectionPool, version: Optional[int] = None) -> bool:
+        """
+        True when the index can answer; otherwise start one background load and return False.
+        A `version` (app_meta.data_version) other than the loaded one invalidates the index first.
+        """
+        if version is not None and self._loaded and version != self._version:
+            if version == self._pending:
+                # this process's own commit: SQLite answers until its write-through lands
+                return False
+            self.invalidate()
+        if self._loaded:
+            return True
+        with self._lock:
+            if self._loader is None or not self._loader.is_alive():
+                self._loader = threading.Thread(
+                    target=self._load_in_background, args=(pool,), name="read-index-load", daemon=True)
+                self._loader.start()
+        return False
+
+    def add_pokemon(self, pokemon_name: str, type_names: List[str], ability_names: List[str], trainer_name: str):
+        """Write-through for one committed pokemon."""
+        with self._lock:
+            self._generation += 1
+            # a reload that already saw the new rows makes this a no-op
+            if not self._loaded or pokemon_name in self.pokemon_abilities:
+                return
+            self._add_types(self.type_pokemon, pokemon_name, *(type_names + [None, None])[:2])
+            for ability_name in ability_names:
+                self.ability_pokemon.setdefault(ability_name.lower(), []).append(pokemon_name)
+                self.pokemon_abilities.setdefault(pokemon_name, []).append(ability_name)
+            if ability_names:
+                self.pokemon_trainers.setdefault(pokemon_name, []).append(trainer_name)
+
+    def add_committed(self, entries, statuses: List[str], version: Optional[int]):
+        """
+        Write-through for a WriteQueue commit: its added pokemon, then the
+        data_version it committed when the index was current just before it,
+        so this process's own writes do not force a reload.
+        """
+        for (pokemon_name, trainer_name, pokemon_data), status in zip(entries, statuses):
+            if status == "added":
+                self.add_pokemon(
+                    pokemon_name,
+                    [t.title() for t in pokemon_data["types"]],
+                    [a["name"].title() for a in pokemon_data["abilities"]],
+                    trainer_name,
+                )
+        with self._lock:
+            if self._loaded and version is not None and self._version == version - 1:
+                self._version = version
+            self._pending = None
+
+    def expect(self, version: Optional[int]):
+        """A WriteQueue commit of `version` is under way (None: it was rolled back)."""
+        with self._lock:
+            self._pending = version
+
+    def pokemon_by_ability(self, ability_name: str) -> List[str]:
+        return list(self.ability_pokemon.get(ability_name.lower(), []))
+
+    def pokemon_by_type(self, type_name: str) -> List[str]:
+        return list(self.type_pokemon.get(type_name.lower(), []))
+
+    def trainers_by_pokemon(self, pokemon_name: str) -> List[str]:
+        return list(self.pokemon_trainers.get(pokemon_name, []))
+
+    def abilities_by_pokemon(self, pokemon_name: str) -> List[str]:
+        return list(self.pokemon_abilities.get(pokemon_name, []))
+
+
+# --- Snapshot Reads ---
+class SnapshotPool(ConnectionPool):
+    """Read-only connections to an in-memory (memdb VFS) snapshot."""
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_name, uri=True, check_same_thread=False, factory=self.factory)
+        conn.execute("PRAGMA query_only = 1")
+        return conn
+
+
+def backup_to_memdb(source: sqlite3.Connection, target: sqlite3.Connection):
+    """
+    source.backup(target) for a target on the memdb VFS, from any journal mode.
+    A copy of a WAL database keeps the WAL flag (header bytes 18/19) and memdb
+    cannot open it, so a WAL source is serialized in one read transaction,
+    flagged back to a rollback journal and copied over from a private
+    in-memory connection.
+    """
+    if source.execute("PRAGMA journal_mode").fetchone()[0] != "wal":
+        source.backup(target)
+        return
+    image = bytearray(source.serialize())
+    image[18] = image[19] = 1
+    staging = sqlite3.connect(":memory:")
+    try:
+        staging.deserialize(image)
+        del image
+        staging.backup(target)
+    finally:
+        staging.close()
+
+
+class SnapshotStore:
+    """
+    Serves reads from an in-memory copy of the database made with the backup API.
+    A background thread builds a fresh copy whenever `refresh()` is called
+    (after a committed write) or the file changes underneath it (a cleaning
+    run, another process), then swaps it in. Readers keep the copy they
+    checked out and never wait for a writer or a rebuild.
+    Quacks like DataVersion, so ETags follow the snapshot being served.
+    """
+
+    def __init__(self, db_name: str = DB_NAME, size: int = POOL_SIZE, poll_interval: float = SNAPSHOT_POLL_INTERVAL,
+                 factory=sqlite3.Connection):
+        self.db_name = db_name
+        self.size = size
+        self.poll_interval = poll_interval
+        self.factory = factory
+        self._lock = threading.Lock()
+        self._wanted = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._source = None
+        self._source_version = None
+        self._generation = 0
+        # (pool, anchor connection keeping the memdb alive, app_meta data_version)
+        self._current = None
+        # id(checked out connection) -> the snapshot pool it belongs to
+        self._owners = {}
+
+    def start(self):
+        """Build the first snapshot now and keep it fresh in the background."""
+        try:
+            self._rebuild()
+        except sqlite3.Error as e:
+            # the refresher keeps trying; until then reads fail like a missing database
+            print(f"Snapshot could not be built: {e}")
+        self._thread = threading.Thread(target=self._run, name="snapshot-refresher", daemon=True)
+        self._thread.start()
+
+    def refresh(self):
+        """Ask for a new snapshot; requests made during a rebuild fold into the next one."""
+        self._wanted.set()
+
+    def _changed(self) -> bool:
+        # PRAGMA data_version moves only when another connection commits
+        try:
+            if self._source is None:
+                return True
+            return self._source.execute("PRAGMA data_version").fetchone()[0] != self._source_version
+        except sqlite3.Error:
+            return True
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wanted.wait(self.poll_interval)
+            if self._stopped.is_set():
+                break
+            if not self._wanted.is_set() and not self._changed():
+                continue
+            self._wanted.clear()
+            try:
+                self._rebuild()
+            except sqlite3.Error as e:
+                print(f"Snapshot refresh failed, still serving the previous one: {e}")
+
+    def _rebuild(self):
+        if self._source is None:
+            if not os.path.exists(self.db_name):
+                raise sqlite3.OperationalError(f"Database file '{self.db_name}' not found")
+            self._source = sqlite3.connect(self.db_name, timeout=BUSY_TIMEOUT, check_same_thread=False)
+        self._generation += 1
+        uri = f"file:/pokemon_snapshot_{id(self)}_{self._generation}?vfs=memdb"
+        anchor = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        try:
+            source_version = self._source.execute("PRAGMA data_version").fetchone()[0]
+            # one step: the copy is a consistent view of a single commit
+            backup_to_memdb(self._source, anchor)
+            row = anchor.execute("SELECT value FROM app_meta WHERE key = 'data_version'").fetchone()
+        except sqlite3.Error:
+            anchor.close()
+            raise
+        snapshot = (SnapshotPool(uri, self.size, factory=self.factory), anchor, row[0] if row else None)
+
+        with self._lock:
+            previous, self._current = self._current, snapshot
+            self._source_version = source_version
+        if previous is not None:
+            # readers still holding a connection finish on the old copy; the
+            # memdb is freed when the last of them is released
+            previous[0].close()
+            previous[1].close()
+
+    def acquire(self) -> sqlite3.Connection:
+        """Check out a connection to the newest snapshot."""
+        while True:
+            with self._lock:
+                current = self._current
+            if current is None:
+                raise sqlite3.OperationalError("No database snapshot available")
+            try:
+                conn = current[0].acquire()
+                break
+            except sqlite3.ProgrammingError:
+                # swapped out between the lookup and the checkout
+                if current is self._current:
+                    raise
+        with self._lock:
+            self._owners[id(conn)] = current[0]
+        return conn
+
+    def release(self, conn: sqlite3.Connection):
+        with self._lock:
+            pool = self._owners.pop(id(conn))
+        pool.release(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def current(self) -> Optional[int]:
+        current = self._current
+        return current[2] if current is not None else None
+
+    def close(self):
+        self._stopped.set()
+        self._wanted.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            current, self._current = self._current, None
+        if current is not None:
+            current[0].close()
+            current[1].close()
+        if self._source is not None:
+            self._source.close()
+
+
 # This function Retrieves all of the  data for any  pokemon that  Exists 
+# (blocking; the API uses the async PokeAPIClient instead)
 def get_pokemon_data(pokemon_name:str):
-    
-    url = f"https://pokeapi.co/api/v2/pokemon/{pokemon_name.lower()}"
+    import httpx
+
+    url = f"{POKEAPI_BASE_URL}/pokemon/{pokemon_name.lower()}"
+    start = time.perf_counter()
+    outcome = "error"
    
     try:
-        r = httpx.get(url, timeout=10)
+        r = httpx.get(url, timeout=POKEAPI_TIMEOUT)
+        outcome = str(r.status_code)
         r.raise_for_status()
     except httpx.HTTPStatusError:
         raise ValueError(f"Pokemon '{pokemon_name}' not found")
     except httpx.RequestError as e:
         raise ConnectionError(f"Network error: {e}")
+    finally:
+        metrics.observe_upstream("pokemon", outcome, time.perf_counter() - start)
 
-    data = r.json()
-
-    pokemon_data = {
-        "name": data["name"],
-        # types in order (primary, secondary)
-        "types": [
-            t["type"]["name"]
-            for t in sorted(data["types"], key=lambda x: x["slot"])
-        ],
-
-        # abilities
-        "abilities": [
-            {
-                "name": a["ability"]["name"],
-                "is_hidden": a["is_hidden"]
-            }
-            for a in data["abilities"]
-        ]
-    }
+    return parse_pokemon_data(r.json())
 
-    return pokemon_data
 
+# --- Pokemon Insertion ---
+def _resolve_name_ids(cursor: sqlite3.Cursor, table_name: str, names, nocase: bool) -> dict:
+    """
+    Map each name to its id in `table_name`, inserting the missing ones in one batch.
+    Lookups follow the column collation; the lowest id wins between duplicates.
+    """
+    key = (lambda name: name.lower()) if nocase else (lambda name: name)
+    sql = f"""
+        SELECT id, name FROM {table_name}
+        WHERE name IN (SELECT value FROM json_each(?))
+        ORDER BY id DESC """
+    names = sorted(set(names))
+    ids = {key(name): id_value for id_value, name in cursor.execute(sql, (json.dumps(names),))}
+
+    missing = []
+    for name in names:
+        if key(name) not in ids:
+            ids[key(name)] = None
+            missing.append(name)
+    if missing:
+        cursor.executemany(f"INSERT INTO {table_name} (name) VALUES (?)", [(name,) for name in missing])
+        ids.update({key(name): id_value for id_value, name in cursor.execute(sql, (json.dumps(missing),))})
+
+    return {name: ids[key(name)] for name in names}
+
+
+def insert_roster(conn: sqlite3.Connection, entries) -> List[str]:
+    """
+    Insert (pokemon_name, trainer_name, pokemon_data) entries inside the caller's transaction.
+    Types, abilities and trainers are resolved once for the whole batch and
+    rows are written with executemany. Returns one status per entry:
+    "added", or "exists" when the pokemon is already stored (or added earlier in the batch).
+    """
+    cursor = conn.cursor()
+    names = [pokemon_name for pokemon_name, _, _ in entries]
+    sql = """ SELECT name FROM pokemon WHERE name IN (SELECT value FROM json_each(?))"""
+    taken = {row[0] for row in cursor.execute(sql, (json.dumps(names),))}
+
+    statuses = []
+    new_entries = []
+    for pokemon_name, trainer_name, pokemon_data in entries:
+        if pokemon_name in taken:
+            statuses.append("exists")
+            continue
+        taken.add(pokemon_name)
+        statuses.append("added")
+        new_entries.append((pokemon_name, trainer_name, pokemon_data))
+
+    if not new_entries:
+        return statuses
+
+    bump_data_version(conn)
+    type_ids = _resolve_name_ids(cursor, "types", (
+        t.title() for _, _, data in new_entries for t in data["types"]), nocase=True)
+    ability_ids = _resolve_name_ids(cursor, "abilities", (
+        a["name"].title() for _, _, data in new_entries for a in data["abilities"]), nocase=True)
+    trainer_ids = _resolve_name_ids(cursor, "trainers", (
+        trainer_name for _, trainer_name, _ in new_entries), nocase=False)
+
+    pokemon_rows = []
+    for pokemon_name, _, data in new_entries:
+        typelist = [type_ids[t.title()] for t in data["types"]]
+        type1_id = typelist[0] if len(typelist) > 0 else None
+        type2_id = typelist[1] if len(typelist) > 1 else None
+        pokemon_rows.append((pokemon_name, type1_id, type2_id))
+    cursor.executemany("INSERT INTO pokemon (name , type1_id , type2_id ) VALUES (?,?,?)", pokemon_rows)
+
+    sql = """ SELECT id, name FROM pokemon WHERE name IN (SELECT value FROM json_each(?))"""
+    pokemon_ids = {name: id_value for id_value, name in cursor.execute(
+        sql, (json.dumps([row[0] for row in pokemon_rows]),))}
+
+    cursor.executemany("""
+        INSERT OR IGNORE INTO trainer_pokemon_abilities 
+        (pokemon_id , trainer_id , ability_id ) VALUES (?,?,?)
+        """, [
+        (pokemon_ids[pokemon_name], trainer_ids[trainer_name], ability_ids[a["name"].title()])
+        for pokemon_name, trainer_name, data in new_entries
+        for a in data["abilities"]
+    ])
+    return statuses
+
+
+def insert_pokemon(conn: sqlite3.Connection, pokemon_name: str, trainer_name: str, pokemon_data: dict) -> bool:
+    """
+    Insert a pokemon, its types, abilities and trainer inside the caller's transaction.
+    Returns False without writing anything if the pokemon already exists.
+    """
+    return insert_roster(conn, [(pokemon_name, trainer_name, pokemon_data)]) == ["added"]
+
+
+# --- Write Queue ---
+class WriteLock:
+    """
+    Cross-process lock held around every write transaction (WriteQueue
+    commits and cleaning), so the writers of several worker processes queue
+    up in the kernel one after another instead of racing SQLite's busy
+    handler. It is an flock on `<db>-write.lock`, opened per acquire so
+    threads of one process exclude each other too; without fcntl it does
+    nothing and busy_timeout alone keeps writers apart.
+    `acquire(timeout)` gives up with WriteLockTimeout instead of waiting out
+    a clean in another process; `with lock:` waits as long as it takes.
+    """
+
+    def __init__(self, db_name: str = DB_NAME):
+        self.path = f"{db_name}-write.lock"
+        self._local = threading.local()
+
+    def acquire(self, timeout: Optional[float] = None):
+        if fcntl is None:
+            return
+        lock_file = open(self.path, "a")
+        try:
+            if timeout is None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            else:
+                deadline = time.monotonic() + timeout
+                while True:
+                    try:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        if time.monotonic() >= deadline:
+                            raise WriteLockTimeout(f"another writer held {self.path} for {timeout}s")
+                        time.sleep(0.01)
+        except BaseException:
+            lock_file.close()
+            raise
+        self._local.file = lock_file
+
+    def release(self):
+        lock_file = getattr(self._local, "file", None)
+        if lock_file is not None:
+            self._local.file = None
+            # closing the file drops the lock
+            lock_file.close()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class WriteQueueFull(Exception):
+    """The write queue is at capacity; the caller should retry later."""
 
-# getting all Pokemon names 
-def get_pokemon_names():
-   
-    url = f"https://pokeapi.co/api/v2/pokemon?limit=500"  
-    r = httpx.get(url)
-    r.raise_for_status()
 
-    data = r.json()
-    names = [p["name"].title() for p in data["results"]]
+class WriteLockTimeout(WriteQueueFull):
+    """Another process (a clean, usually) kept the write lock too long; retry later."""
 
-    return names
+
+class WriteQueue:
+    """
+    Single writer for every roster insert. Callers `await submit(entries)`;
+    one task drains whatever is pending into a single transaction (group
+    commit) on its own connection and thread, then resolves each caller
+    with its insert_roster statuses. There is never a second writer in the
+    process to fight over SQLite's lock, and `write_lock` lines it up with
+    the writers of other worker processes. The queue is bounded: `submit`
+    raises WriteQueueFull instead of letting requests pile up. A `read_index`
+    gets each commit's new pokemon before the callers are resolved.
+    """
+
+    def __init__(self, db_name: str = DB_NAME, maxsize: int = WRITE_QUEUE_SIZE,
+                 batch_size: int = WRITE_BATCH_SIZE, factory=sqlite3.Connection,
+                 write_lock: Optional[WriteLock] = None, read_index: Optional[ReadIndex] = None):
+        self.db_name = db_name
+        self.batch_size = batch_size
+        self.read_index = read_index
+        self.factory = factory
+        self.write_lock = write_lock if write_lock is not None else WriteLock(db_name)
+        self._queue = asyncio.Queue(maxsize=maxsize)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="writer")
+        self._conn = None
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, entries) -> List[str]:
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((list(entries), future))
+        except asyncio.QueueFull:
+            metrics.WRITE_QUEUE_REJECTED.inc()
+            raise WriteQueueFull(f"{self._queue.qsize()} writes already queued")
+        return await future
+
+    def _commit(self, entries) -> List[str]:
+        if self._conn is None:
+            if not os.path.exists(self.db_name):
+                raise sqlite3.OperationalError(f"Database file '{self.db_name}' not found")
+            self._conn = sqlite3.connect(self.db_name, timeout=BUSY_TIMEOUT, factory=self.factory)
+        # a clean in another process may hold it for minutes: give up (503) instead
+        self.write_lock.acquire(WRITE_LOCK_TIMEOUT)
+        try:
+            self._conn.execute("BEGIN IMMEDIATE")
+            statuses = insert_roster(self._conn, entries)
+            version = self._conn.execute("SELECT value FROM app_meta WHERE key = 'data_version'").fetchone()
+            if self.read_index is not None:
+                self.read_index.expect(version[0] if version else None)
+            self._conn.commit()
+        except BaseException:
+            self._conn.rollback()
+            if self.read_index is not None:
+                self.read_index.expect(None)
+            raise
+        finally:
+            self.write_lock.release()
+        if self.read_index is not None:
+            self.read_index.add_committed(entries, statuses, version[0] if version else None)
+        return statuses
+
+    async def _write(self, batch):
+        if not batch:
+            return
+        loop = asyncio.get_running_loop()
+        entries = [entry for submitted, _ in batch for entry in submitted]
+        metrics.WRITE_BATCH_ENTRIES.observe((), len(entries))
+        try:
+            statuses = await loop.run_in_executor(self._executor, self._commit, entries)
+        except Exception as e:
+            # a lock held elsewhere fails every submission alike: no retries one by one
+            if len(batch) == 1 or isinstance(e, WriteLockTimeout):
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            # one bad submission must not fail the others: retry them one by one
+            for submitted, future in batch:
+                await self._write([(submitted, future)])
+            return
+        start = 0
+        for submitted, future in batch:
+            if not future.done():
+                future.set_result(statuses[start:start + len(submitted)])
+            start += len(submitted)
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            size = len(batch[0][0])
+            # everything that queued up during the previous commit goes in this one
+            while size < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                size += len(batch[-1][0])
+            try:
+                await self._write([(entries, future) for entries, future in batch if not future.cancelled()])
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def close(self):
+        """Finish what is queued, then stop the writer."""
+        if self._task is not None:
+            await self._queue.join()
+            self._task.cancel()
+        # the connection belongs to the writer thread
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._close_connection)
+        self._executor.shutdown()
+
+    def _close_connection(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+# Reference vocabularies come from the on-disk PokeAPI cache (see pokeapi.py)
+# getting all Pokemon names 
+def get_pokemon_names():
+    return [name.title() for name in load_vocabularies(["pokemon"])["pokemon"]]
  
 # getting all pokemon types
 def get_pokemon_types():
-    url = f"https://pokeapi.co/api/v2/type?limit=500"
-    r = httpx.get(url)
-    r.raise_for_status()
-
-    data = r.json()
-    pokemon_types = [t["name"].title() for t in data["results"]]
-
-    return  pokemon_types
+    return [name.title() for name in load_vocabularies(["types"])["types"]]
 
 # getting all pokemon abilities 
 def get_pokemon_abilities():
-    
-    url = f"https://pokeapi.co/api/v2/ability?limit=1000"
-    r = httpx.get(url)
-    r.raise_for_status()
-
-    data = r.json()
-    pokemon_abilities = [a["name"].title() for a in data["results"]]
-
-    return pokemon_abilities
+    return [name.title() for name in load_vocabularies(["abilities"])["abilities"]]
 
 # --- Data Cleaning ---
-def clean_database(conn: sqlite3.Connection):
+def database_fingerprint(conn: sqlite3.Connection) -> str:
+    """
+    Cheap stand-in for a hash of the data: schema version, app_meta data_version,
+    row count and highest id of every table cleaning touches, and dirty rows left.
+    Index-only reads, so it costs milliseconds where hashing every name would not.
+    """
+    parts = [
+        conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations").fetchone(),
+        conn.execute("SELECT value FROM app_meta WHERE key = 'data_version'").fetchone(),
+        conn.execute("SELECT COUNT(*) FROM clean_dirty").fetchone(),
+    ] + [
+        conn.execute(f"SELECT COUNT(*), MAX(id) FROM {table_name}").fetchone()
+        for table_name in ("pokemon", "types", "abilities", "trainers", "trainer_pokemon_abilities")
+    ]
+    return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+
+def stored_fingerprint(conn: sqlite3.Connection) -> Optional[str]:
+    """The fingerprint saved by the last successful clean, if any."""
+    row = conn.execute("SELECT value FROM app_meta WHERE key = 'clean_fingerprint'").fetchone()
+    return row[0] if row else None
+
+
+def _store_fingerprint(conn: sqlite3.Connection):
+    # inside the caller's transaction, so it commits with the clean it describes
+    conn.execute("INSERT OR REPLACE INTO app_meta (key, value) VALUES ('clean_fingerprint', ?)",
+                 (database_fingerprint(conn),))
+
+
+def clean_plan_summary(conn: sqlite3.Connection) -> List[dict]:
+    """Rows per table, action and reason in temp.clean_plan."""
+    sql = """
+        SELECT table_name, action, reason, COUNT(*) FROM temp.clean_plan
+        GROUP BY table_name, action, reason
+        ORDER BY MIN(step) """
+    return [
+        {"table": table_name, "action": action, "reason": reason, "rows": rows}
+        for table_name, action, reason, rows in conn.execute(sql)
+    ]
+
+
+def clean_plan_report(conn: sqlite3.Connection):
+    """temp.clean_plan as diff lines, one per change, in the order they were made."""
+    sql = "SELECT table_name, row_id, action, old_value, new_value, reason FROM temp.clean_plan ORDER BY step"
+    for table_name, row_id, action, old_value, new_value, reason in conn.execute(sql):
+        # roster rows and set-null columns are described, names are quoted
+        if table_name != "trainer_pokemon_abilities" and action != "set null":
+            old_value = f'"{old_value}"'
+        line = f"{CLEAN_PLAN_SYMBOLS[action]} {table_name} #{row_id} {old_value}"
+        if action == "rename":
+            line += f' -> "{new_value}"'
+        elif action == "merge":
+            line += f" -> #{new_value}"
+        elif action == "set null":
+            line += " -> NULL"
+        yield f"{line} ({reason})"
+
+
+def clean_database(conn: sqlite3.Connection, read_index: Optional[ReadIndex] = None, full: bool = False,
+                   dry_run: bool = False, progress: Optional[CleanProgress] = None,
+                   report: bool = True, write_lock: Optional[WriteLock] = None) -> Optional[List[dict]]:
     """
     Task 2: Clean up the database using the provided connection object.
     Implement logic to:
@@ -344,55 +1343,466 @@ def clean_database(conn: sqlite3.Connection):
       Choose a consistent strategy (e.g., keep the first encountered/lowest ID).
     - Correct known misspellings (e.g., 'Pikuchu' -> 'Pikachu', 'gras' -> 'Grass', etc.).
     - Standardize casing (e.g., 'fire' -> 'Fire' or all lowercase for names/types/abilities).
+    Only rows inserted or renamed since the last run (tracked in clean_dirty)
+    are cleaned; full=True cleans every row again.
+    Every pass runs in one write transaction that records each change in
+    temp.clean_plan: it is committed once at the end (nothing is applied
+    if any pass fails), or with dry_run=True printed as a diff report and
+    rolled back (report=False skips the diff). Returns the plan summary
+    (see clean_plan_summary), or None when nothing was applied because of
+    an error. Stages are counted into `progress`, whose cancel() stops the
+    run with CleanCancelled, again applying nothing. `write_lock` is held
+    for the transaction, so writers in other processes wait for it.
     """
 
     if not conn:
         print("Error: Invalid database connection provided for cleaning.")
         return
     
-    print("Starting database cleaning...")
+    print("Starting database cleaning..." if not dry_run else "Planning database cleaning (dry run)...")
+    if progress is None:
+        progress = CleanProgress()
 
     try:
        # Retrieving pokemon data used  for Cleaning data 
 
         # --- Implement Here ---
+        apply_migrations(conn)
         db_tables = ["pokemon","types","abilities","trainers"]
-        #db_tables = ["pokemon"]
+        if full:
+            dirty_tables = set(db_tables)
+        else:
+            sql = """ SELECT DISTINCT table_name FROM clean_dirty """
+            dirty_tables = {row[0] for row in conn.execute(sql)}
+            if not dirty_tables:
+                print("Database cleaning skipped: no rows changed since the last run.")
+                if not dry_run and stored_fingerprint(conn) != database_fingerprint(conn):
+                    _store_fingerprint(conn)
+                    conn.commit()
+                return []
+
+        # all reference lists in one go: warm cache or one concurrent refresh;
+        # fetched before the write transaction so no lock is held meanwhile
+        wanted = [table for table in ("pokemon", "types", "abilities") if table in dirty_tables]
+        with progress.stage("database", "vocabularies"):
+            vocabularies = {
+                table: [name.title() for name in names]
+                for table, names in (load_vocabularies(wanted) if wanted else {}).items()
+            }
+
+        if write_lock is not None:
+            write_lock.acquire()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(CLEAN_PLAN_SCHEMA)
+        conn.execute("DELETE FROM temp.clean_plan")
+        changed = False
+        if full:
+            # every row is rewritten: one rebuild beats per-row trigger upkeep
+            pause_read_tables(conn)
         for db_table in db_tables:
             
-            cleaned_data = CleanPokemon(db_table,conn)
-            # --- Remove Redundant data ---    
-            cleaned_data.remove_redundant_data()
-
-            if db_table == "pokemon" :
-                cleaned_data.correct_spelling(get_pokemon_names())
-
-            if db_table == "types" :
-                cleaned_data.correct_spelling(get_pokemon_types())
-
-            if db_table == "types" :
-                cleaned_data.correct_spelling(get_pokemon_abilities())    
-
-
-            cleaned_data.standardise_case()
-            cleaned_data.delete_duplicates()
+            cleaned_data = CleanPokemon(db_table, conn, full=full, progress=progress)
+            with progress.stage(db_table, "begin"):
+                rows = cleaned_data.begin()
+                progress.add(rows)
+            if not rows:
+                continue
+            changed = True
+            # --- Remove Redundant data, spelling and case: one chunked pass ---
+            # trainers have no reference list; a failed pass has rolled back
+            with progress.stage(db_table, "clean_names"):
+                if not cleaned_data.clean_names(vocabularies.get(db_table)):
+                    progress.abort()
+                    print("Database cleaning aborted: no changes applied.")
+                    return
+            with progress.stage(db_table, "delete_duplicates"):
+                planned = conn.execute("SELECT COUNT(*) FROM temp.clean_plan").fetchone()[0]
+                if not cleaned_data.delete_duplicates():
+                    progress.abort()
+                    print("Database cleaning aborted: no changes applied.")
+                    return
+                progress.add(rows, conn.execute("SELECT COUNT(*) FROM temp.clean_plan").fetchone()[0] - planned)
+            cleaned_data.finish()
              
         # --- End Implementation ---
+        if full:
+            with progress.stage("database", "read_tables"):
+                refresh_read_tables(conn)
+        if changed:
+            # new ETags for every read endpoint
+            bump_data_version(conn)
+        summary = clean_plan_summary(conn)
+        for change in summary:
+            print(f"  {change['table']}: {change['rows']} {change['action']} ({change['reason']})")
+
+        if dry_run:
+            if report:
+                for line in clean_plan_report(conn):
+                    print(line)
+            conn.rollback()
+            print("Dry run finished: no changes applied.")
+            return summary
+
+        with progress.stage("database", "commit"):
+            _store_fingerprint(conn)
+            conn.commit()
+        if read_index is not None:
+            read_index.invalidate()
         print("Database cleaning finished and changes committed.")
+        return summary
 
     except sqlite3.Error as e:
         print(f"An error occurred during database cleaning: {e}")
         conn.rollback()  # Roll back changes on error
         return
+    except BaseException:
+        # interrupted: leave the database exactly as it was
+        conn.rollback()
+        raise
+    finally:
+        if write_lock is not None:
+            write_lock.release()
+
+
+def clean_if_changed(conn: sqlite3.Connection, read_index: Optional[ReadIndex] = None,
+                     write_lock: Optional[WriteLock] = None) -> bool:
+    """
+    Clean unless the data is exactly as the last successful clean left it
+    (same database_fingerprint); returns whether a clean ran.
+    """
+    try:
+        unchanged = stored_fingerprint(conn) == database_fingerprint(conn)
+    except sqlite3.Error as e:
+        print(f"Database fingerprint could not be read: {e}")
+        unchanged = False
+    if unchanged:
+        print("Database cleaning skipped: unchanged since the last clean.")
+        return False
+    clean_database(conn, read_index, write_lock=write_lock)
+    return True
+
+
+# --- Background Cleaning ---
+class CleanJobRunning(Exception):
+    """Another cleaning job is still running; only one runs at a time."""
+
+
+class CleanJob:
+    """One clean_database run started by CleanJobs, with its live progress."""
+
+    def __init__(self, job_id: int, full: bool, dry_run: bool):
+        self.id = job_id
+        self.full = full
+        self.dry_run = dry_run
+        self.progress = CleanProgress()
+        self.state = "running"   # then succeeded, failed or cancelled
+        self.summary = None
+        self.error = None
+        self.started_at = time.time()
+        self.finished_at = None
+        self.conn = None
+        self.thread = None
+
+    def status(self) -> dict:
+        return {
+            "id": self.id,
+            "state": self.state,
+            "full": self.full,
+            "dry_run": self.dry_run,
+            "started_at": self.started_at,
+            "elapsed": round((self.finished_at or time.time()) - self.started_at, 3),
+            "tables": self.progress.report(),
+            "summary": self.summary,
+            "error": self.error,
+        }
+
+
+class CleanJobs:
+    """
+    Runs clean_database as a background job on its own connection and
+    thread, so the API keeps serving reads meanwhile. One job at a time:
+    `start` raises CleanJobRunning while another is running. The last
+    `history` jobs are kept for their status. Jobs live in this process
+    only, which is why create_fastapi_app drops /admin with several workers.
+    """
+
+    def __init__(self, db_name: str = DB_NAME, read_index: Optional[ReadIndex] = None,
+                 factory=sqlite3.Connection, history: int = CLEAN_JOB_HISTORY,
+                 write_lock: Optional[WriteLock] = None):
+        self.db_name = db_name
+        self.read_index = read_index
+        self.factory = factory
+        self.write_lock = write_lock if write_lock is not None else WriteLock(db_name)
+        self.history = history
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._next_id = 1
+        self._running = None
+
+    def running(self) -> Optional[CleanJob]:
+        return self._running
+
+    def get(self, job_id: int) -> Optional[CleanJob]:
+        return self._jobs.get(job_id)
+
+    def start(self, full: bool = False, dry_run: bool = False) -> CleanJob:
+        with self._lock:
+            if self._running is not None:
+                raise CleanJobRunning(f"Cleaning job {self._running.id} is still running")
+            job = CleanJob(self._next_id, full, dry_run)
+            self._next_id += 1
+            self._jobs[job.id] = job
+            # dicts keep insertion order: drop the oldest finished jobs
+            while len(self._jobs) > self.history:
+                del self._jobs[next(iter(self._jobs))]
+            self._running = job
+            job.thread = threading.Thread(target=self._run, args=(job,), name=f"clean-job-{job.id}", daemon=True)
+        job.thread.start()
+        return job
+
+    def cancel(self, job_id: int) -> Optional[CleanJob]:
+        """Stop a running job; its transaction rolls back, so nothing is applied."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job is self._running:
+                job.progress.cancel()
+                # stops a long statement too, not just the next chunk
+                if job.conn is not None:
+                    job.conn.interrupt()
+        return job
+
+    def _run(self, job: CleanJob):
+        summary = None
+        try:
+            conn = sqlite3.connect(self.db_name, timeout=BUSY_TIMEOUT, check_same_thread=False,
+                                   factory=self.factory)
+            # without WAL, spilling dirty pages to the file mid-run would take the
+            # exclusive lock and block every reader: keep them in memory until the commit
+            if conn.execute("PRAGMA journal_mode").fetchone()[0] != "wal":
+                conn.execute("PRAGMA cache_spill = OFF")
+            with self._lock:
+                job.conn = conn
+            try:
+                summary = clean_database(conn, self.read_index, full=job.full, dry_run=job.dry_run,
+                                         progress=job.progress, report=False, write_lock=self.write_lock)
+            finally:
+                with self._lock:
+                    job.conn = None
+                conn.close()
+        except CleanCancelled:
+            pass
+        except Exception as e:
+            print(f"Cleaning job {job.id} failed: {e}")
+            job.error = str(e)
+
+        with self._lock:
+            job.finished_at = time.time()
+            # a cancel that arrives once the run has committed is too late
+            if summary is not None:
+                job.state = "succeeded"
+                job.summary = summary
+            elif job.progress.cancelled:
+                job.state = "cancelled"
+            else:
+                job.state = "failed"
+                job.error = job.error or "Cleaning failed and nothing was applied; see the server log"
+            self._running = None
+        print(f"Cleaning job {job.id} {job.state} in {job.finished_at - job.started_at:.2f}s")
+
+    def close(self):
+        """Cancel the running job, if any, and wait for it to roll back."""
+        job = self._running
+        if job is not None:
+            self.cancel(job.id)
+            job.thread.join()
 
 # --- FastAPI Application ---
-def create_fastapi_app() -> FastAPI:
+# --- Endpoint Queries ---
+# Single indexed lookups on the denormalized read tables (see read_tables.py);
+# rows come back in insertion order.
+POKEMON_BY_ABILITY_SQL = """
+    SELECT pokemon_name FROM roster_read
+    WHERE ability_name = ?
+    ORDER BY tpa_id """
+
+POKEMON_BY_TYPE_SQL = """
+    SELECT name FROM pokemon_read
+    WHERE type1_name = ? OR type2_name = ?
+    ORDER BY pokemon_id """
+
+TRAINERS_BY_POKEMON_SQL = """
+    SELECT trainer_name FROM roster_read
+    WHERE pokemon_name = ?
+    GROUP BY trainer_name
+    ORDER BY MIN(tpa_id) """
+
+ABILITIES_BY_POKEMON_SQL = """
+    SELECT ability_name FROM roster_read
+    WHERE pokemon_name = ?
+    ORDER BY tpa_id """
+
+# Keyset pages: (name, key) rows after the key of the previous page's last
+# row. LIMIT -1 means no limit, for streaming.
+POKEMON_BY_ABILITY_PAGE_SQL = """
+    SELECT pokemon_name, tpa_id FROM roster_read
+    WHERE ability_name = ? AND tpa_id > ?
+    ORDER BY tpa_id
+    LIMIT ? """
+
+POKEMON_BY_TYPE_PAGE_SQL = """
+    SELECT name, pokemon_id FROM pokemon_read
+    WHERE (type1_name = ? OR type2_name = ?) AND pokemon_id > ?
+    ORDER BY pokemon_id
+    LIMIT ? """
+
+# Every requested pokemon that exists, with its roster rows in insertion order
+# (none: a single row of NULLs); names are passed as one JSON array
+ROSTER_BY_POKEMON_BATCH_SQL = """
+    SELECT pk.name, rr.ability_name, rr.trainer_name FROM pokemon pk
+        LEFT JOIN roster_read rr ON rr.pokemon_id = pk.id
+    WHERE pk.name IN (SELECT value FROM json_each(?))
+    ORDER BY rr.tpa_id """
+
+metrics.name_queries({
+    "pokemon_by_ability": POKEMON_BY_ABILITY_SQL,
+    "pokemon_by_type": POKEMON_BY_TYPE_SQL,
+    "trainers_by_pokemon": TRAINERS_BY_POKEMON_SQL,
+    "abilities_by_pokemon": ABILITIES_BY_POKEMON_SQL,
+    "pokemon_by_ability_page": POKEMON_BY_ABILITY_PAGE_SQL,
+    "pokemon_by_type_page": POKEMON_BY_TYPE_PAGE_SQL,
+    "roster_by_pokemon_batch": ROSTER_BY_POKEMON_BATCH_SQL,
+})
+
+# name -> (sql, sample parameters) for the EXPLAIN QUERY PLAN check
+ENDPOINT_QUERIES = {
+    "pokemon_by_ability": (POKEMON_BY_ABILITY_SQL, ("Overgrow",)),
+    "pokemon_by_type": (POKEMON_BY_TYPE_SQL, ("Grass", "Grass")),
+    "trainers_by_pokemon": (TRAINERS_BY_POKEMON_SQL, ("Bulbasaur",)),
+    "abilities_by_pokemon": (ABILITIES_BY_POKEMON_SQL, ("Bulbasaur",)),
+    "pokemon_by_ability_page": (POKEMON_BY_ABILITY_PAGE_SQL, ("Overgrow", 0, 100)),
+    "pokemon_by_type_page": (POKEMON_BY_TYPE_PAGE_SQL, ("Grass", "Grass", 0, 100)),
+    "roster_by_pokemon_batch": (ROSTER_BY_POKEMON_BATCH_SQL, ('["Bulbasaur", "Pikachu"]',)),
+}
+
+
+def migrate_database(conn: sqlite3.Connection):
+    """Bring the schema up to date and report endpoint queries that still scan a table."""
+    # persistent in the file; a no-op once set
+    mode = conn.execute(f"PRAGMA journal_mode = {JOURNAL_MODE}").fetchone()[0]
+    if mode != JOURNAL_MODE.lower():
+        print(f"Warning: journal mode is {mode}, not {JOURNAL_MODE}")
+    apply_migrations(conn)
+    # a full clean that never finished leaves the read tables paused
+    if not read_tables_live(conn):
+        print("Rebuilding read tables left paused by an unfinished clean")
+        rebuild_read_tables(conn)
+    for name, scans in check_query_plans(conn, ENDPOINT_QUERIES).items():
+        print(f"Warning: {name} query does not use an index: {'; '.join(scans)}")
+
+
+def create_fastapi_app(use_read_cache: bool = READ_CACHE_ENABLED, use_metrics: bool = METRICS_ENABLED,
+                       use_etags: bool = True, cache_control: str = CACHE_CONTROL,
+                       use_snapshot: bool = SNAPSHOT_READS, use_admin: bool = ADMIN_ENABLED) -> "FastAPI":
     """
     FastAPI application instance.
     Define the FastAPI app and include all the required endpoints below.
+    With `use_read_cache` the GET endpoints answer from an in-memory ReadIndex
+    instead of querying SQLite (POKEMON_READ_CACHE=0 turns it off).
+    With `use_metrics` request, SQL and PokeAPI timings are served at /metrics
+    (POKEMON_METRICS=0 turns it off).
+    With `use_etags` read responses carry an ETag from app_meta.data_version and
+    matching If-None-Match requests get 304 with `cache_control` (POKEMON_CACHE_CONTROL).
+    With `use_snapshot` reads go to an in-memory SnapshotStore copy of the
+    database instead of the file (POKEMON_SNAPSHOT_READS=1 turns it on).
+    With `use_admin` /admin/clean runs clean_database as a background CleanJobs
+    job while reads are served; writes get 503 until it ends (POKEMON_ADMIN=1
+    turns it on; it is unauthenticated, so it is off by default). With more
+    than one worker (POKEMON_WORKERS) it stays off: every worker would number
+    its own jobs and enforce one job at a time only among them.
     """
+    from fastapi import FastAPI, HTTPException, Path, Query, Response
+    from fastapi.concurrency import run_in_threadpool
+    from fastapi.responses import PlainTextResponse, StreamingResponse
+
+    from schemas import PokemonLookup, RosterEntry
+
     print("Creating FastAPI app and defining endpoints...")
-    app = FastAPI(title="Pokemon Assessment API")
+    if use_admin and WORKERS > 1:
+        print(f"Admin endpoints disabled: clean jobs are per process and there are {WORKERS} workers")
+        use_admin = False
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        factory = metrics.TimedConnection if use_metrics else sqlite3.Connection
+        # One pool per app; every endpoint checks its connections out of it
+        app.state.pool = ConnectionPool(DB_NAME, POOL_SIZE, factory=factory)
+        # coalesced and cached upstream lookups
+        app.state.pokeapi = PokemonDataCache(PokeAPIClient())
+        try:
+            with app.state.pool.connection() as conn:
+                migrate_database(conn)
+        except sqlite3.Error as e:
+            print(f"Database migrations could not be applied: {e}")
+        # the index is its own in-memory copy, loaded from the file so it is never behind;
+        # it loads in the background so the first requests need not wait for it
+        app.state.read_index = ReadIndex() if use_read_cache else None
+        if app.state.read_index is not None:
+            app.state.read_index.ready(app.state.pool)
+        # every insert goes through the one writer, which takes turns with
+        # the writers of other worker processes and writes through to the index
+        write_lock = WriteLock(DB_NAME)
+        app.state.writes = WriteQueue(DB_NAME, factory=factory, write_lock=write_lock,
+                                      read_index=app.state.read_index)
+        app.state.writes.start()
+        # reads (pool or snapshot) vs writes and freshness checks (always the pool)
+        app.state.snapshot = SnapshotStore(DB_NAME, POOL_SIZE, factory=factory) if use_snapshot else None
+        if app.state.snapshot is not None:
+            app.state.snapshot.start()
+        app.state.reads = app.state.snapshot or app.state.pool
+        if use_etags:
+            # a snapshot is tagged with the version it was copied at
+            app.state.data_version = app.state.snapshot or DataVersion(DB_NAME)
+        else:
+            app.state.data_version = None
+        # writes from other processes (workers, a CLI clean) never reach this
+        # process's index, and ETags move with data_version: follow it too.
+        # The index is loaded from the file, so it follows the file, not a snapshot
+        app.state.index_version = None
+        if app.state.read_index is not None:
+            app.state.index_version = (app.state.data_version if isinstance(app.state.data_version, DataVersion)
+                                       else DataVersion(DB_NAME))
+        app.state.clean_jobs = (CleanJobs(DB_NAME, app.state.read_index, factory=factory, write_lock=write_lock)
+                                if use_admin else None)
+        yield
+        if app.state.clean_jobs is not None:
+            # an unfinished job rolls back rather than delaying shutdown
+            await run_in_threadpool(app.state.clean_jobs.close)
+        await app.state.writes.close()
+        await app.state.pokeapi.aclose()
+        if app.state.data_version is not None and app.state.data_version is not app.state.snapshot:
+            app.state.data_version.close()
+        if app.state.index_version is not None and app.state.index_version is not app.state.data_version:
+            app.state.index_version.close()
+        if app.state.snapshot is not None:
+            app.state.snapshot.close()
+        app.state.pool.close()
+        print("DB Connection Pool Closed")
+
+    app = FastAPI(title="Pokemon Assessment API", lifespan=lifespan)
+    if use_etags:
+        app.add_middleware(ConditionalGetMiddleware, cache_control=cache_control)
+    if use_metrics:
+        app.add_middleware(metrics.MetricsMiddleware, routes=app.router.routes)
+
+        @app.get("/metrics", include_in_schema=False)
+        def read_metrics():
+            return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+    def read_index_ready() -> bool:
+        if app.state.read_index is None:
+            return False
+        tracker = app.state.index_version
+        return app.state.read_index.ready(app.state.pool, tracker.current() if tracker is not None else None)
 
     # --- Define Endpoints Here ---
     @app.get("/")
@@ -406,6 +1816,48 @@ def create_fastapi_app() -> FastAPI:
         return {"message": "Pokemon Assessment API - Basic"}
         # --- End Implementation ---
 
+    def list_names(sql: str, params: tuple, limit: Optional[int], after: Optional[int],
+                   stream: bool, response: Response, not_found: str):
+        """
+        Keyset-paginated or streamed answer for the list endpoints; both always read SQLite.
+        A page holds at most `limit` names and sets X-Next-Cursor when more follow.
+        A stream is NDJSON (one JSON string per line) read with fetchmany, so
+        memory stays flat whatever the size of the result.
+        """
+        after = after or 0
+        if stream:
+            conn = app.state.reads.acquire()
+            try:
+                cursor = conn.execute(sql, params + (after, limit or -1))
+                batch = cursor.fetchmany(STREAM_BATCH_SIZE)
+            except BaseException:
+                app.state.reads.release(conn)
+                raise
+            if not batch:
+                app.state.reads.release(conn)
+                raise HTTPException(status_code=404, detail=not_found)
+
+            def lines(batch):
+                # the connection stays checked out until the last row is sent
+                try:
+                    while batch:
+                        yield "".join(json.dumps(name) + "\n" for name, _ in batch)
+                        batch = cursor.fetchmany(STREAM_BATCH_SIZE)
+                finally:
+                    cursor.close()
+                    app.state.reads.release(conn)
+
+            return StreamingResponse(lines(batch), media_type="application/x-ndjson")
+
+        with app.state.reads.connection() as conn:
+            rows = conn.execute(sql, params + (after, limit + 1)).fetchall()
+        if not rows:
+            raise HTTPException(status_code=404, detail=not_found)
+        if len(rows) > limit:
+            rows = rows[:limit]
+            response.headers["X-Next-Cursor"] = str(rows[-1][1])
+        return [name for name, _ in rows]
+
     @app.get("/pokemon/ability/{ability_name}", response_model=List[str])
     def get_pokemon_by_ability(ability_name: str = Path(
         ...,
@@ -413,46 +1865,46 @@ def create_fastapi_app() -> FastAPI:
         max_length=30,
         pattern="^[A-Za-z-]+$",
         description="Pokemon ability name (Titlecase, hyphen-separated)"
-    )):
+    ), response: Response = None,
+        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+        after: Optional[int] = Query(None, ge=0, description="X-Next-Cursor of the previous page"),
+        stream: bool = Query(False, description="Stream every match as NDJSON")):
         """
         Task 4: Retrieve all Pokémon names with a specific ability.
         Query the cleaned database. Handle cases where the ability doesn't exist.
         """
         # --- Implement here ---
 
+        ability_name = ability_name.title()
+        if limit is not None or after is not None or stream:
+            try:
+                return list_names(POKEMON_BY_ABILITY_PAGE_SQL, (ability_name,), limit if stream else limit or MAX_PAGE_SIZE,
+                                  after, stream, response,
+                                  f"No Pokémon found with ability '{ability_name}' found ")
+            except sqlite3.Error as e:
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Some Unforseen  Error occured please Contact your administrator"
+                )
         try: 
-            
-            ability_name = ability_name.title()
-            conn = connect_db()
-            if conn:
-                cursor = conn.cursor()
-                sql = """
-                SELECT  pk.name  FROM pokemon pk 
-                    inner join trainer_pokemon_abilities tpa on pk.id = tpa.pokemon_id 
-                    inner join abilities ab on tpa.ability_id = ab.id
-                    where ab.name =  ? """
-            
-                cursor.execute(sql, (ability_name,))
-                rows = cursor.fetchall()
-
-                if not rows:
-                    conn.close()
-                    raise HTTPException(
-                        status_code=404,
-                        detail=f"No Pokémon found with ability '{ability_name}' found "
-                    )
-            else : 
-                raise HTTPException(status_code=500, detail="Database connection failed")  
-                
-            conn.close()
-            return [row[0] for row in rows]
+            if read_index_ready():
+                rows = [(name,) for name in app.state.read_index.pokemon_by_ability(ability_name)]
+            else:
+                with app.state.reads.connection() as conn:
+                    rows = conn.execute(POKEMON_BY_ABILITY_SQL, (ability_name,)).fetchall()
         
         except sqlite3.Error as e:
             raise HTTPException(
                     status_code=500,
                     detail=f"Some Unforseen  Error occured please Contact your administrator"
                 )
-        
+
+        if not rows:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No Pokémon found with ability '{ability_name}' found "
+            )
+        return [row[0] for row in rows]
         
         # --- End Implementation ---
 
@@ -463,48 +1915,46 @@ def create_fastapi_app() -> FastAPI:
         max_length=30,
         pattern="^[A-Za-z-]+$",
         description="Pokemon Type name (Titlecase, hyphen-separated)"
-    )):
+    ), response: Response = None,
+        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+        after: Optional[int] = Query(None, ge=0, description="X-Next-Cursor of the previous page"),
+        stream: bool = Query(False, description="Stream every match as NDJSON")):
         """
         Task 5: Retrieve all Pokémon names of a specific type (considers type1 and type2).
         Query the cleaned database. Handle cases where the type doesn't exist.
         """
         # --- Implement here ---
+
+        type_name = type_name.title()
+        if limit is not None or after is not None or stream:
+            try:
+                return list_names(POKEMON_BY_TYPE_PAGE_SQL, (type_name, type_name), limit if stream else limit or MAX_PAGE_SIZE,
+                                  after, stream, response,
+                                  f"No Pokémon found with type '{type_name}' found ")
+            except sqlite3.Error as e:
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Some Unforseen Error occured please contact your administrator"
+                )
         try: 
-            
-            type_name = type_name.title()
-            conn = connect_db()
-
-            if conn:
-                cursor = conn.cursor()
-
-                sql = """
-                    SELECT pk.name
-                    FROM pokemon pk
-                    LEFT JOIN types t1 ON pk.type1_id = t1.id
-                    LEFT JOIN types t2 ON pk.type2_id = t2.id
-                    WHERE t1.name = ? OR t2.name = ?
-                    """
-                cursor.execute(sql, (type_name, type_name))
-           
-                rows = cursor.fetchall()
-
-                if not rows:
-                    conn.close()
-                    raise HTTPException(
-                        status_code=404,
-                        detail=f"No Pokémon found with type '{type_name}' found "
-                    )
-            else : 
-                raise HTTPException(status_code=500, detail="Database connection failed") 
-             
-            conn.close()
-            return [row[0] for row in rows]
+            if read_index_ready():
+                rows = [(name,) for name in app.state.read_index.pokemon_by_type(type_name)]
+            else:
+                with app.state.reads.connection() as conn:
+                    rows = conn.execute(POKEMON_BY_TYPE_SQL, (type_name, type_name)).fetchall()
         
         except sqlite3.Error as e:
             raise HTTPException(
                     status_code=500,
                     detail=f"Some Unforseen Error occured please contact your administrator"
                 )
+
+        if not rows:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No Pokémon found with type '{type_name}' found "
+            )
+        return [row[0] for row in rows]
         # --- End Implementation ---
 
     @app.get("/trainers/pokemon/{pokemon_name}", response_model=List[str])
@@ -521,43 +1971,26 @@ def create_fastapi_app() -> FastAPI:
         """
         # --- Implement here ---
 
+        pokemon_name = pokemon_name.title()
         try: 
-            
-            pokemon_name = pokemon_name.title()
-            conn = connect_db()
-            
-            if conn:
-                cursor = conn.cursor()
-
-                sql = """
-                SELECT  tr.name  FROM trainers tr 
-                    inner join trainer_pokemon_abilities tpa on tr.id = tpa.trainer_id
-                    inner join pokemon pk on pk.id = tpa.pokemon_id  
-                    where pk.name =  ?
-                     group by pk.name
-                       """
-            
-                cursor.execute(sql, (pokemon_name,))
-
-                rows = cursor.fetchall()
-
-                if not rows:
-                    conn.close()
-                    raise HTTPException(
-                        status_code=404,
-                        detail=f"No Trainer names found for pokemon named '{pokemon_name}' found "
-                    )
-            else : 
-                raise HTTPException(status_code=500, detail="Database connection failed")  
-                
-            conn.close()
-            return [row[0] for row in rows]
+            if read_index_ready():
+                rows = [(name,) for name in app.state.read_index.trainers_by_pokemon(pokemon_name)]
+            else:
+                with app.state.reads.connection() as conn:
+                    rows = conn.execute(TRAINERS_BY_POKEMON_SQL, (pokemon_name,)).fetchall()
         
         except sqlite3.Error as e:
             raise HTTPException(
                     status_code=500,
                     detail=f"Some Unforseen Error occured please contact your administrator"
                 )
+
+        if not rows:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No Trainer names found for pokemon named '{pokemon_name}' found "
+            )
+        return [row[0] for row in rows]
         # --- End Implementation ---
 
   
@@ -576,45 +2009,123 @@ def create_fastapi_app() -> FastAPI:
         Task 7: Retrieve all ability names of a specific Pokémon.
         Query the cleaned database. Handle cases where the Pokémon doesn't exist.
         """
+        pokemon_name = pokemon_name.title()
         try: 
-            
-            pokemon_name = pokemon_name.title()
-            conn = connect_db()
-
-            if conn:
-                cursor = conn.cursor()
-
-                sql = """
-                SELECT  ab.name  FROM abilities ab 
-                    inner join trainer_pokemon_abilities tpa on ab.id = tpa.ability_id
-                    inner join pokemon pk on pk.id = tpa.pokemon_id  
-                    where pk.name =  ? """
-            
-                cursor.execute(sql, (pokemon_name,))
-
-                rows = cursor.fetchall()
-
-                if not rows:
-                    conn.close()
-                    raise HTTPException(
-                        status_code=404,
-                        detail=f"No Abilities found for pokemon named '{pokemon_name}' found "
-                    )
-                
-            conn.close()
-            return [row[0] for row in rows]
+            if read_index_ready():
+                rows = [(name,) for name in app.state.read_index.abilities_by_pokemon(pokemon_name)]
+            else:
+                with app.state.reads.connection() as conn:
+                    rows = conn.execute(ABILITIES_BY_POKEMON_SQL, (pokemon_name,)).fetchall()
         
         except sqlite3.Error as e:
             raise HTTPException(
                     status_code=500,
                     detail=f"Some Unforseen  Error occured please Contact your administrator"
                 )
+
+        if not rows:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No Abilities found for pokemon named '{pokemon_name}' found "
+            )
+        return [row[0] for row in rows]
         # --- End Implementation ---
 
+    @app.get("/search")
+    def search_by_name(q: str = Query(..., min_length=1, max_length=100, description="Name or name prefix, any case"),
+                       limit: int = Query(20, ge=1, le=SEARCH_MAX_LIMIT),
+                       kind: Optional[Literal["pokemon", "type", "ability", "trainer"]] = Query(None)):
+        """
+        Autocomplete over pokemon, type, ability and trainer names.
+        Every word of `q` is matched as a prefix, best matches first. When
+        nothing matches, results for the closest spellings are returned with
+        "fuzzy": true. No match at all is an empty list, not a 404.
+        """
+        try:
+            with app.state.reads.connection() as conn:
+                results, fuzzy = search_names(conn, q, limit, kind)
+        except sqlite3.Error as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Some Unforseen  Error occured please Contact your administrator"
+            )
+        return {"query": q, "fuzzy": fuzzy, "results": results}
+
+    def refuse_writes_while_cleaning():
+        # a cleaning job holds SQLite's write lock until it commits or rolls back
+        if app.state.clean_jobs is not None and app.state.clean_jobs.running() is not None:
+            raise HTTPException(
+                status_code=503,
+                detail="Database cleaning in progress, please try again later",
+                headers={"Retry-After": "5"}
+            )
+
+    def write_rejected(e: WriteQueueFull) -> HTTPException:
+        # the 503 for a write WriteQueue.submit turned away, shared by every insert endpoint
+        if isinstance(e, WriteLockTimeout):
+            # another process (a CLI clean) is writing
+            return HTTPException(
+                status_code=503,
+                detail="The database is busy with another writer (cleaning?), please try again later",
+                headers={"Retry-After": "5"}
+            )
+        return HTTPException(
+            status_code=503,
+            detail="Too many writes in progress, please try again later",
+            headers={"Retry-After": "1"}
+        )
+
+    @app.post("/pokemon/lookup")
+    def lookup_pokemon(lookup: PokemonLookup):
+        """
+        Abilities and/or trainers of many pokemon in one request and one query.
+        Returns {"found": n, "results": {name: {"status": "found", "abilities": [...],
+        "trainers": [...]}}}; a pokemon that does not exist gets {"status": "not_found"}
+        instead of failing the whole request. Lists are in the same order as the
+        single-pokemon endpoints and may be empty.
+        """
+        if len(lookup.pokemon) > BULK_MAX_ITEMS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"At most {BULK_MAX_ITEMS} pokemon can be looked up at once"
+            )
+
+        names = list(dict.fromkeys(name.title() for name in lookup.pokemon))
+        try:
+            with app.state.reads.connection() as conn:
+                rows = conn.execute(ROSTER_BY_POKEMON_BATCH_SQL, (json.dumps(names),)).fetchall()
+        except sqlite3.Error as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Some Unforseen  Error occured please Contact your administrator"
+            )
+
+        abilities = {}
+        trainers = {}
+        for pokemon_name, ability_name, trainer_name in rows:
+            abilities.setdefault(pokemon_name, [])
+            # trainers keep the order of their first roster row, like GROUP BY ... MIN(tpa_id)
+            trainers.setdefault(pokemon_name, {})
+            if ability_name is not None:
+                abilities[pokemon_name].append(ability_name)
+                trainers[pokemon_name].setdefault(trainer_name)
+
+        results = {}
+        for name in names:
+            if name not in abilities:
+                results[name] = {"status": "not_found"}
+                continue
+            results[name] = {"status": "found"}
+            if "abilities" in lookup.include:
+                results[name]["abilities"] = abilities[name]
+            if "trainers" in lookup.include:
+                results[name]["trainers"] = list(trainers[name])
+        return {"found": len(abilities), "results": results}
+
     # --- Implement Task 8 here ---
     
     @app.post("/pokemon/{pokemon_name}/trainer/{trainer_name}")
-    def add_pokemon(pokemon_name: str = Path(
+    async def add_pokemon(pokemon_name: str = Path(
         ...,
         min_length=1,
         max_length=30,
@@ -628,142 +2139,247 @@ def create_fastapi_app() -> FastAPI:
         description="Pokemon name (Titlecase, hyphen-separated)"
     )):
         
-        try:     
-            pokemon_name = pokemon_name.title()
-            trainer_name = trainer_name.title() 
-            
-            conn = connect_db()
+        pokemon_name = pokemon_name.title()
+        trainer_name = trainer_name.title() 
+        refuse_writes_while_cleaning()
 
-            if conn:
-                
-                cursor = conn.cursor()
-                conn.execute("BEGIN")
+        def pokemon_exists():
+            with app.state.pool.connection() as conn:
                 sql = """ SELECT id FROM pokemon WHERE name = ?"""
-                cursor.execute(sql, (pokemon_name,))
+                return conn.execute(sql, (pokemon_name,)).fetchone() is not None
 
-                existing = cursor.fetchone()
+        try:     
+            if await run_in_threadpool(pokemon_exists):
+                raise HTTPException(
+                    status_code=409,
+                    detail="Pokemon already exists"
+                )
 
-                if existing:
-                    raise HTTPException(
-                        status_code=409,
-                        detail="Pokemon already exists"
-                    )
-               
-                try:
-                    pokemon_data = get_pokemon_data(pokemon_name.lower())
-                except ValueError:
-                    raise HTTPException(
-                        status_code=404,
-                        detail=f"No Pokémon named '{pokemon_name}' found"
-                    )
-            
-                typelist=[]
-                abilitylist=[]
-                trainer_id = 0 
-                pokemon_id = 0 
-
-                #Checking  if types  exist if not  add types
-                for  pokemon_types in pokemon_data["types"]:
-                    sql = """
-                        SELECT  tp.id , tp.name  FROM types tp
-                        where tp.name =  ? """
-                    cursor.execute(sql, (pokemon_types.title(),))
-                    pokemon_type = cursor.fetchone()
-
-                    if pokemon_type:
-                        typelist.append(pokemon_type[0])
-                    else : 
-                        sql = """
-                        INSERT INTO types (name) VALUES (?)
-                        """
-                        cursor.execute(sql, (pokemon_types.title(),))
-                        typelist.append(cursor.lastrowid) 
-            
-                #Checking if abilities  exist if not  add ability
-                for ability in pokemon_data["abilities"]:
-                    
-                    sql = """
-                        SELECT  ab.id , ab.name  FROM abilities ab
-                        where ab.name =  ? """
-                    cursor.execute(sql, (ability['name'].title(),))
-                    pokemon_ability = cursor.fetchone()
-
-                    if pokemon_ability:
-                        abilitylist.append(pokemon_ability[0])
-                    else : 
-                        sql = """
-                        INSERT INTO abilities (name) VALUES (?)
-                        """
-                        cursor.execute(sql, (ability['name'].title(),))
-                        abilitylist.append(cursor.lastrowid) 
-                
-                #check  if trainer exist if not add trainer
-                sql = """
-                        SELECT  tr.id , tr.name  FROM trainers tr
-                        where tr.name =  ? """
-                cursor.execute(sql, (trainer_name,))
-                trainer = cursor.fetchone()
-
-                if trainer:
-                    trainer_id = trainer[0]
-                else : 
-                    sql = """
-                    INSERT INTO trainers (name) VALUES (?)
-                    """
-                    cursor.execute(sql, (trainer_name,))
-                    trainer_id = cursor.lastrowid
-                
-                # now we can Add the pokemon 
-                type1_id = typelist[0] if len(typelist) > 0 else None
-                type2_id = typelist[1] if len(typelist) > 1 else None
-                
-                sql = """
-                    INSERT INTO pokemon (name , type1_id , type2_id ) VALUES (?,?,?)
-                    """
-                cursor.execute(sql, (pokemon_name,type1_id,type2_id ))
-                pokemon_id = cursor.lastrowid
-            
-                #inserting trainer_pokemon_abilities
-                for abilityID in abilitylist:
-                    sql = """
-                    INSERT OR IGNORE INTO trainer_pokemon_abilities 
-                    (pokemon_id , trainer_id , ability_id ) VALUES (?,?,?)
-                    """
-                    cursor.execute(sql, (pokemon_id,trainer_id,abilityID))
-            
-            conn.commit()          
+            # The upstream call finishes before any transaction is opened
+            try:
+                pokemon_data = await app.state.pokeapi.get_pokemon_data(pokemon_name)
+            except ValueError:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"No Pokémon named '{pokemon_name}' found"
+                )
+            except ConnectionError:
+                raise HTTPException(
+                    status_code=502,
+                    detail="PokeAPI is unavailable, please try again later"
+                )
+
+            # another request may have added it while we were fetching
+            written = await app.state.writes.submit([(pokemon_name, trainer_name, pokemon_data)])
+            if written != ["added"]:
+                raise HTTPException(
+                    status_code=409,
+                    detail="Pokemon already exists"
+                )
+            if app.state.snapshot is not None:
+                app.state.snapshot.refresh()
             return {"message": "Successfully added"}
         except HTTPException:
-            conn.rollback()
             raise
+        except WriteQueueFull as e:
+            raise write_rejected(e)
         except sqlite3.Error as e:
-            conn.rollback()
             raise HTTPException(
                 status_code=500,
                 detail=f"Some Unforseen  Error occured please Contact your administrator"
             )
-        finally:
-            if conn:
-                conn.close()
+
+    @app.post("/pokemon/bulk")
+    async def add_pokemon_bulk(entries: List[RosterEntry]):
+        """
+        Import a roster of (pokemon, trainer) pairs in one go.
+        Upstream data for the new pokemon is fetched concurrently, then every row
+        is written in a single transaction. Each entry gets its own status:
+        added, exists, duplicate, not_found or upstream_error.
+        """
+        if len(entries) > BULK_MAX_ITEMS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"At most {BULK_MAX_ITEMS} entries can be imported at once"
+            )
+        refuse_writes_while_cleaning()
+
+        pairs = [(entry.pokemon.title(), entry.trainer.title()) for entry in entries]
+        statuses = [None] * len(pairs)
+        seen = set()
+        for i, pair in enumerate(pairs):
+            if pair in seen:
+                statuses[i] = "duplicate"
+            seen.add(pair)
+        names = list(dict.fromkeys(name for name, _ in pairs))
+
+        def existing_pokemon():
+            with app.state.pool.connection() as conn:
+                sql = """ SELECT name FROM pokemon WHERE name IN (SELECT value FROM json_each(?))"""
+                return {row[0] for row in conn.execute(sql, (json.dumps(names),))}
+
+        async def fetch(name):
+            try:
+                return await app.state.pokeapi.get_pokemon_data(name)
+            except ValueError:
+                return "not_found"
+            except ConnectionError:
+                return "upstream_error"
+
+        try:
+            existing = await run_in_threadpool(existing_pokemon)
+            to_fetch = [name for name in names if name not in existing]
+            # PokeAPIClient bounds how many of these are in flight
+            fetched = dict(zip(to_fetch, await asyncio.gather(*(fetch(name) for name in to_fetch))))
+
+            roster = []
+            positions = []
+            for i, (pokemon_name, trainer_name) in enumerate(pairs):
+                if statuses[i] is not None:
+                    continue
+                if pokemon_name in existing:
+                    statuses[i] = "exists"
+                elif isinstance(fetched[pokemon_name], str):
+                    statuses[i] = fetched[pokemon_name]
+                else:
+                    roster.append((pokemon_name, trainer_name, fetched[pokemon_name]))
+                    positions.append(i)
+
+            if roster:
+                written = await app.state.writes.submit(roster)
+                if "added" in written and app.state.snapshot is not None:
+                    app.state.snapshot.refresh()
+                for i, status in zip(positions, written):
+                    statuses[i] = status
+        except WriteQueueFull as e:
+            raise write_rejected(e)
+        except sqlite3.Error as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Some Unforseen  Error occured please Contact your administrator"
+            )
+
+        return {
+            "added": statuses.count("added"),
+            "results": [
+                {"pokemon": pokemon_name, "trainer": trainer_name, "status": status}
+                for (pokemon_name, trainer_name), status in zip(pairs, statuses)
+            ],
+        }
 
 
         
     # --- End Implementation ---
 
+    if use_admin:
+        @app.post("/admin/clean", status_code=202)
+        def start_clean_job(full: bool = False, dry_run: bool = False):
+            """
+            Start clean_database in the background (full=True re-cleans every row,
+            dry_run=True applies nothing). 409 while another job is running.
+            """
+            try:
+                job = app.state.clean_jobs.start(full=full, dry_run=dry_run)
+            except CleanJobRunning as e:
+                raise HTTPException(status_code=409, detail=str(e))
+            return job.status()
+
+        @app.get("/admin/clean/{job_id}")
+        def clean_job_status(job_id: int):
+            """State, per-table and per-stage progress, and the plan summary once done."""
+            job = app.state.clean_jobs.get(job_id)
+            if job is None:
+                raise HTTPException(status_code=404, detail=f"No cleaning job {job_id}")
+            return job.status()
+
+        @app.post("/admin/clean/{job_id}/cancel", status_code=202)
+        def cancel_clean_job(job_id: int):
+            """Stop a running job; it rolls back, so none of its changes are applied."""
+            job = app.state.clean_jobs.get(job_id)
+            if job is None:
+                raise HTTPException(status_code=404, detail=f"No cleaning job {job_id}")
+            if job.state != "running":
+                raise HTTPException(status_code=409, detail=f"Cleaning job {job_id} already {job.state}")
+            app.state.clean_jobs.cancel(job_id)
+            return job.status()
+
     print("FastAPI app created successfully.")
     return app
 
 
 # --- Main execution / Uvicorn setup (Optional - for candidate to run locally) ---
+def _option(args: List[str], name: str, default: str) -> str:
+    # "--name value" from the command line
+    if name in args and args.index(name) + 1 < len(args):
+        return args[args.index(name) + 1]
+    return default
+
+
+def _serve_workers(workers: int, host: str, port: int):
+    """
+    uvicorn.run(..., workers=N), but on a listening socket created as TCP.
+    uvicorn binds with proto 0, and asyncio only sets TCP_NODELAY on accepted
+    sockets whose proto is IPPROTO_TCP, so every response would otherwise wait
+    out the client's delayed ACK (~40 ms).
+    """
+    import socket
+    import uvicorn
+    from uvicorn.supervisors import Multiprocess
+
+    config = uvicorn.Config("candidate_solution:create_fastapi_app", factory=True, workers=workers,
+                            host=host, port=port)
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.set_inheritable(True)
+    print(f"Serving on http://{host}:{sock.getsockname()[1]} with {workers} workers")
+    try:
+        Multiprocess(config, sockets=[sock]).run()
+    except KeyboardInterrupt:
+        pass
+
+
 if __name__ == "__main__":
-    # Ensure data is cleaned before running the app for testing
+    # python candidate_solution.py clean [--full] [--dry-run]   clean, then exit
+    # python candidate_solution.py [serve] [--full] [--workers N] [--host H] [--port P]
+    #                                                           clean if the data changed, then serve
+    args = sys.argv[1:]
+    command = args.pop(0) if args and not args[0].startswith("-") else "serve"
+    if command not in ("clean", "serve"):
+        print("usage: python candidate_solution.py clean [--full] [--dry-run]"
+              " | serve [--full] [--workers N] [--host H] [--port P]")
+        sys.exit(1)
+
     temp_conn = connect_db()
     if temp_conn:
-        clean_database(temp_conn)
+        migrate_database(temp_conn)
+        # a server may already be running: queue behind its writers
+        write_lock = WriteLock(DB_NAME)
+        if command == "clean" or "--full" in args:
+            # --full re-cleans every row; --dry-run prints the change plan and applies nothing
+            clean_database(temp_conn, full="--full" in args, dry_run="--dry-run" in args, write_lock=write_lock)
+        else:
+            clean_if_changed(temp_conn, write_lock=write_lock)
         temp_conn.close()
         print("DB Connection Closed")
     else :
         print("DB Does Not Exist")
-        
-    app_instance = create_fastapi_app()
-    uvicorn.run(app_instance, host="127.0.0.1", port=8000)
+        # every endpoint needs the tables: there is nothing to serve
+        sys.exit(1)
+
+    if command == "serve":
+        import uvicorn
+
+        workers = int(_option(args, "--workers", str(WORKERS)))
+        host = _option(args, "--host", "127.0.0.1")
+        port = int(_option(args, "--port", "8000"))
+        if workers > 1:
+            # every worker is a fresh process that imports this module and builds
+            # its own app, so its connections, pool and writer are opened there
+            os.environ["POKEMON_WORKERS"] = str(workers)
+            os.environ["POKEMON_DB"] = DB_NAME
+            _serve_workers(workers, host, port)
+        else:
+            app_instance = create_fastapi_app()
+            uvicorn.run(app_instance, host=host, port=port)
@@ -0,0 +1,126 @@
+# fuzzy_match.py
+from collections import OrderedDict
+from difflib import SequenceMatcher, get_close_matches
+from heapq import heappush, heapreplace
+from typing import Dict, Iterable, List, Tuple
+
+# Words at least this long trigger SequenceMatcher's autojunk heuristic,
+# which can make an exact match score below 1.0
+AUTOJUNK_MIN_LENGTH = 200
+
+
+class FuzzyMatcher:
+    """
+    Drop-in replacement for `difflib.get_close_matches` over a fixed vocabulary.
+
+    The vocabulary is indexed once: an inverted index from each character to
+    the (word, count) pairs containing it. For a query, the index gives every
+    word's character overlap, which is the same upper bound difflib's
+    `quick_ratio` uses. Candidates are scored with SequenceMatcher in order of
+    that bound and the scan stops as soon as no remaining word can reach the
+    current n-th best score, so results are identical to difflib's.
+    Repeated queries are answered from an LRU memo.
+    """
+
+    def __init__(self, vocabulary: Iterable[str], n: int = 3, cutoff: float = 0.6, cache_size: int = 65536):
+        if not n > 0:
+            raise ValueError("n must be > 0: %r" % (n,))
+        if not 0.0 <= cutoff <= 1.0:
+            raise ValueError("cutoff must be in [0.0, 1.0]: %r" % (cutoff,))
+
+        self.n = n
+        self.cutoff = cutoff
+        self.cache_size = cache_size
+        self.words: List[str] = list(vocabulary)
+        self.lengths: List[int] = [len(word) for word in self.words]
+        self._exact = set(self.words)
+        self._memo: "OrderedDict[Tuple[str, int, float], List[str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        for index, word in enumerate(self.words):
+            for char, count in _char_counts(word).items():
+                self._postings.setdefault(char, []).append((index, count))
+
+    def __len__(self):
+        return len(self.words)
+
+    def get_close_matches(self, word: str, n: int = None, cutoff: float = None) -> List[str]:
+        """Same contract as `difflib.get_close_matches(word, vocabulary, n, cutoff)`."""
+        n = self.n if n is None else n
+        cutoff = self.cutoff if cutoff is None else cutoff
+        if not n > 0:
+            raise ValueError("n must be > 0: %r" % (n,))
+        if not 0.0 <= cutoff <= 1.0:
+            raise ValueError("cutoff must be in [0.0, 1.0]: %r" % (cutoff,))
+
+        key = (word, n, cutoff)
+        memo = self._memo
+        if key in memo:
+            memo.move_to_end(key)
+            self.hits += 1
+            return list(memo[key])
+
+        self.misses += 1
+        matches = self._search(word, n, cutoff)
+        memo[key] = matches
+        if len(memo) > self.cache_size:
+            memo.popitem(last=False)
+        return list(matches)
+
+    def _search(self, word: str, n: int, cutoff: float) -> List[str]:
+        if not word:
+            return get_close_matches(word, self.words, n, cutoff)
+
+        # An identical word scores 1.0 and no other word can tie it
+        if n == 1 and word in self._exact and len(word) < AUTOJUNK_MIN_LENGTH:
+            return [word]
+
+        # Character overlap with every word sharing at least one character
+        overlap: Dict[int, int] = {}
+        for char, query_count in _char_counts(word).items():
+            for index, count in self._postings.get(char, ()):
+                overlap[index] = overlap.get(index, 0) + min(query_count, count)
+
+        word_length = len(word)
+        lengths = self.lengths
+        candidates = []
+        for index, common in overlap.items():
+            bound = 2.0 * common / (word_length + lengths[index])
+            if bound >= cutoff:
+                candidates.append((bound, index))
+        # words sharing no characters only qualify when even 0.0 passes
+        if cutoff <= 0.0:
+            candidates.extend((0.0, index) for index in range(len(self.words)) if index not in overlap)
+        candidates.sort(reverse=True)
+
+        matcher = SequenceMatcher()
+        matcher.set_seq2(word)
+        best: List[Tuple[float, str]] = []   # min-heap of the n best (score, word)
+        for bound, index in candidates:
+            if len(best) == n and bound < best[0][0]:
+                break
+            candidate = self.words[index]
+            matcher.set_seq1(candidate)
+            score = matcher.ratio()
+            if score < cutoff:
+                continue
+            if len(best) < n:
+                heappush(best, (score, candidate))
+            elif (score, candidate) > best[0]:
+                heapreplace(best, (score, candidate))
+
+        return [candidate for score, candidate in sorted(best, reverse=True)]
+
+    def clear_cache(self):
+        self._memo.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def _char_counts(word: str) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for char in word:
+        counts[char] = counts.get(char, 0) + 1
+    return counts
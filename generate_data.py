@@ -0,0 +1,211 @@
+# generate_data.py
+"""
+Synthetic dirty-data generator on the setup_db.py schema.
+
+Names are drawn from the bundled PokeAPI snapshot (trainers are made up), so
+spelling correction has real work to do, and each name is dirtied with
+seeded, independent noise:
+
+    junk_rate       '???', '---' or '' instead of a name
+    typo_rate       one character replaced
+    case_rate       UPPER, lower or rAnDoM case
+    duplicate_rate  the row repeats a name already written to the table
+
+A table that needs more distinct names than the snapshot has gets numbered
+forms of them ("Pikachu-2"), the way trainers get numbered, so
+duplicate_rate holds at every scale. The names used are written next to the
+database as <output>.vocabulary.json in the snapshot's format; clean with
+POKEAPI_OFFLINE=1 POKEAPI_SNAPSHOT_FILE=<output>.vocabulary.json so the
+forms are kept apart instead of corrected back to their base name.
+
+    python generate_data.py --rows 100000 --seed 7 --output bench.db
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import time
+from typing import Dict, Iterator, List
+
+from pokeapi import BUNDLED_SNAPSHOT_FILE
+from setup_db import create_schema
+
+JUNK_NAMES = ["???", "---", ""]
+FIRST_NAMES = ["Ash", "Brock", "Misty", "Gary", "Dawn", "May", "Max", "Iris", "Cilan", "Serena",
+               "Clemont", "Lillie", "Kiawe", "Lana", "Mallow", "Sophocles", "Gloria", "Hop", "Leon", "Red"]
+LAST_NAMES = ["Ketchum", "Oak", "Birch", "Rowan", "Elm", "Juniper", "Sycamore", "Kukui", "Magnolia", "Sada",
+              "Stone", "Waterflower", "Harrison", "Maple", "Berlitz", "Yellow", "Green", "Blue", "Silver", "Gold"]
+INSERT_CHUNK = 50000
+
+
+def table_sizes(rows: int) -> Dict[str, int]:
+    """Row counts per table for `rows` pokemon."""
+    return {
+        "types": max(40, rows // 200),
+        "abilities": max(400, rows // 20),
+        "trainers": max(20, rows // 20),
+        "pokemon": rows,
+        "trainer_pokemon_abilities": 2 * rows,
+    }
+
+
+class NameNoise:
+    """Seeded name noise at the configured rates."""
+
+    def __init__(self, rng: random.Random, case_rate: float, typo_rate: float,
+                 junk_rate: float, duplicate_rate: float):
+        self.rng = rng
+        self.case_rate = case_rate
+        self.typo_rate = typo_rate
+        self.junk_rate = junk_rate
+        self.duplicate_rate = duplicate_rate
+
+    def dirty(self, name: str) -> str:
+        rng = self.rng
+        if rng.random() < self.junk_rate:
+            return rng.choice(JUNK_NAMES)
+        if name and rng.random() < self.typo_rate:
+            position = rng.randrange(len(name))
+            name = name[:position] + rng.choice("aeioutrs") + name[position + 1:]
+        if rng.random() < self.case_rate:
+            style = rng.randrange(3)
+            if style == 0:
+                name = name.upper()
+            elif style == 1:
+                name = name.lower()
+            else:
+                name = "".join(c.upper() if rng.random() < 0.5 else c.lower() for c in name)
+        return name
+
+    def names(self, vocabulary: List[str], count: int) -> Iterator[str]:
+        # fresh names walk the vocabulary in order (see shuffled_vocabulary);
+        # once it runs out every row is a duplicate anyway
+        rng = self.rng
+        used = 0
+        for _ in range(count):
+            if used and (used >= len(vocabulary) or rng.random() < self.duplicate_rate):
+                name = vocabulary[rng.randrange(used)]
+            else:
+                name = vocabulary[used]
+                used += 1
+            yield self.dirty(name)
+
+
+def shuffled_vocabulary(rng: random.Random, names: List[str], count: int) -> List[str]:
+    """
+    `names` in a seeded order, followed by numbered forms ("Pikachu-2",
+    "Pikachu-3", ...) in the same order until there are `count` names.
+    """
+    order = list(names)
+    rng.shuffle(order)
+    vocabulary = list(order)
+    suffix = 2
+    while len(vocabulary) < count:
+        vocabulary.extend(f"{name}-{suffix}" for name in order)
+        suffix += 1
+    return vocabulary[:max(count, len(order))]
+
+
+def vocabulary_file(db_name: str) -> str:
+    """Where generate_database writes the vocabularies of `db_name`."""
+    return f"{db_name}.vocabulary.json"
+
+
+def trainer_vocabulary(count: int) -> List[str]:
+    names = [f"{first} {last}" for last in LAST_NAMES for first in FIRST_NAMES]
+    suffix = 2
+    while len(names) < count:
+        names.extend(f"{first} {last} {suffix}" for last in LAST_NAMES for first in FIRST_NAMES)
+        suffix += 1
+    return names[:count]
+
+
+def _insert_chunks(cursor: sqlite3.Cursor, sql: str, rows: Iterator[tuple]):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= INSERT_CHUNK:
+            cursor.executemany(sql, chunk)
+            chunk = []
+    if chunk:
+        cursor.executemany(sql, chunk)
+
+
+def generate_database(db_name: str, rows: int = 10000, seed: int = 0, case_rate: float = 0.2,
+                      typo_rate: float = 0.05, junk_rate: float = 0.01, duplicate_rate: float = 0.1) -> Dict[str, int]:
+    """
+    Create `db_name` from scratch with `rows` pokemon (other tables scale with it)
+    and return the row count of every table. The same arguments always
+    produce the same database. The pokemon, type and ability names it may
+    use are written to vocabulary_file(db_name).
+    """
+    if os.path.exists(db_name):
+        os.remove(db_name)
+
+    with open(BUNDLED_SNAPSHOT_FILE) as f:
+        snapshot = json.load(f)
+    sizes = table_sizes(rows)
+    rng = random.Random(seed)
+    noise = NameNoise(rng, case_rate, typo_rate, junk_rate, duplicate_rate)
+    vocabularies = {
+        # distinct names a table can get at this duplicate rate, plus slack for the dice
+        table_name: shuffled_vocabulary(rng, [name.title() for name in snapshot[table_name]],
+                                        int(sizes[table_name] * (1 - duplicate_rate) * 1.1) + 1)
+        for table_name in ("pokemon", "types", "abilities")
+    }
+    with open(vocabulary_file(db_name), "w") as f:
+        json.dump({table_name: [name.lower() for name in names] for table_name, names in vocabularies.items()}, f)
+    vocabularies["trainers"] = trainer_vocabulary(sizes["trainers"])
+
+    conn = sqlite3.connect(db_name)
+    # a throwaway file: durability buys nothing while it is being written
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    cursor = conn.cursor()
+    create_schema(cursor)
+
+    for table_name in ("types", "abilities", "trainers"):
+        _insert_chunks(cursor, f"INSERT INTO {table_name} (name) VALUES (?)",
+                       ((name,) for name in noise.names(vocabularies[table_name], sizes[table_name])))
+
+    type_count = sizes["types"]
+    _insert_chunks(cursor, "INSERT INTO pokemon (name, type1_id, type2_id) VALUES (?, ?, ?)", (
+        (name, rng.randint(1, type_count), rng.randint(1, type_count) if rng.random() < 0.5 else None)
+        for name in noise.names(vocabularies["pokemon"], sizes["pokemon"])
+    ))
+
+    ability_count, trainer_count = sizes["abilities"], sizes["trainers"]
+    _insert_chunks(cursor, """
+        INSERT INTO trainer_pokemon_abilities (pokemon_id, trainer_id, ability_id) VALUES (?, ?, ?)""", (
+        (rng.randint(1, rows), rng.randint(1, trainer_count), rng.randint(1, ability_count))
+        for _ in range(sizes["trainer_pokemon_abilities"])
+    ))
+
+    conn.commit()
+    conn.close()
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000, help="pokemon rows; other tables scale with it")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--case-rate", type=float, default=0.2)
+    parser.add_argument("--typo-rate", type=float, default=0.05)
+    parser.add_argument("--junk-rate", type=float, default=0.01)
+    parser.add_argument("--duplicate-rate", type=float, default=0.1)
+    # never the working database: the output is deleted first
+    parser.add_argument("--output", default="generated.db")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    sizes = generate_database(args.output, args.rows, args.seed, args.case_rate,
+                              args.typo_rate, args.junk_rate, args.duplicate_rate)
+    print(f"Database '{args.output}' generated in {time.perf_counter() - start:.1f}s: "
+          + ", ".join(f"{table} {count}" for table, count in sizes.items()))
+    print(f"Vocabularies written to '{vocabulary_file(args.output)}'")
+
+
+if __name__ == "__main__":
+    main()
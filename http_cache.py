@@ -0,0 +1,110 @@
+# http_cache.py
+import os
+import sqlite3
+import threading
+from typing import Optional, Sequence
+
+# read endpoints whose responses depend only on the database contents
+CACHEABLE_PREFIXES = ("/pokemon/", "/trainers/", "/abilities/", "/search")
+
+
+def bump_data_version(conn: sqlite3.Connection):
+    """Mark a write; runs inside the caller's transaction so the bump commits with it."""
+    conn.execute("UPDATE app_meta SET value = value + 1 WHERE key = 'data_version'")
+
+
+class DataVersion:
+    """
+    Cheap view of app_meta.data_version for ETags.
+
+    A dedicated read-only connection polls `PRAGMA data_version`, which only
+    changes after another connection commits, so the counter row is re-read
+    only when something was actually written. The connection never waits
+    for locks: when the database is busy or missing the version is unknown
+    (None) and the response simply goes out without an ETag. The connection
+    is opened on first use, and never creates a missing file.
+    """
+
+    def __init__(self, db_name: str):
+        self.db_name = db_name
+        self._conn = None
+        self._lock = threading.Lock()
+        self._pragma = None
+        self._version = None
+
+    def current(self) -> Optional[int]:
+        with self._lock:
+            try:
+                if self._conn is None:
+                    if not os.path.exists(self.db_name):
+                        return None
+                    self._conn = sqlite3.connect(self.db_name, timeout=0, check_same_thread=False)
+                pragma = self._conn.execute("PRAGMA data_version").fetchone()[0]
+                if pragma != self._pragma or self._version is None:
+                    row = self._conn.execute(
+                        "SELECT value FROM app_meta WHERE key = 'data_version'").fetchone()
+                    self._version = row[0] if row else None
+                    self._pragma = pragma
+            except sqlite3.Error:
+                return None
+            return self._version
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # weak comparison, as If-None-Match requires
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ConditionalGetMiddleware:
+    """
+    Pure ASGI middleware adding ETag and Cache-Control to successful GET/HEAD
+    responses of the read endpoints. A request whose If-None-Match holds the
+    current ETag gets 304 before the endpoint (and its query) runs.
+    The tracker is looked up on app.state.data_version at request time.
+    """
+
+    def __init__(self, app, cache_control: str = "no-cache", prefixes: Sequence[str] = CACHEABLE_PREFIXES):
+        self.app = app
+        self.cache_control = cache_control.encode()
+        self.prefixes = tuple(prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["method"] not in ("GET", "HEAD")
+                or not scope["path"].startswith(self.prefixes)):
+            await self.app(scope, receive, send)
+            return
+
+        tracker = getattr(scope["app"].state, "data_version", None)
+        version = tracker.current() if tracker is not None else None
+        if version is None:
+            await self.app(scope, receive, send)
+            return
+
+        etag = f'"v{version}"'
+        for name, value in scope["headers"]:
+            if name == b"if-none-match" and _etag_matches(value.decode("latin-1"), etag):
+                await send({
+                    "type": "http.response.start",
+                    "status": 304,
+                    "headers": [(b"etag", etag.encode()), (b"cache-control", self.cache_control)],
+                })
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"etag", etag.encode()), (b"cache-control", self.cache_control)]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
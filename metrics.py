@@ -0,0 +1,248 @@
+# metrics.py
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+# Seconds; fine enough at the low end for SQLite lookups that take microseconds
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: Tuple[str, ...] = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, labels)} {value}" for labels, value in values]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: Tuple[str, ...] = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+    def set(self, labels: Tuple[str, ...], value: float):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram:
+    """Prometheus histogram; bucket counts are kept per bucket and summed on render."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, labels: Tuple[str, ...] = ()) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        lines = []
+        for labels, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Everything in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "pokemon_http_requests_total", "HTTP requests by route, method and status code.",
+    ("route", "method", "status")))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "pokemon_http_request_duration_seconds", "HTTP request latency by route and method.",
+    ("route", "method")))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "pokemon_http_requests_in_flight", "HTTP requests being served, by route.",
+    ("route",)))
+SQL_LATENCY = REGISTRY.register(Histogram(
+    "pokemon_sql_execute_duration_seconds", "SQLite statement execution time by query.",
+    ("query",)))
+UPSTREAM_LATENCY = REGISTRY.register(Histogram(
+    "pokemon_pokeapi_request_duration_seconds", "PokeAPI request time by resource and outcome.",
+    ("resource", "outcome")))
+POKEAPI_CACHE = REGISTRY.register(Counter(
+    "pokemon_pokeapi_cache_lookups_total",
+    "Pokemon lookups by cache result: hit, negative_hit, miss (upstream call) or coalesced (joined one).",
+    ("result",)))
+WRITE_BATCH_ENTRIES = REGISTRY.register(Histogram(
+    "pokemon_write_batch_entries", "Roster entries committed per write-queue transaction.",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)))
+WRITE_QUEUE_REJECTED = REGISTRY.register(Counter(
+    "pokemon_write_queue_rejected_total", "Writes refused with 503 because the write queue was full."))
+
+
+# --- HTTP ---
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware task per request) recording
+    latency, status codes and in-flight requests per route template.
+    """
+
+    def __init__(self, app, routes=()):
+        # only the API needs starlette; the cleaning path imports this module too
+        from starlette.routing import Match
+
+        self.app = app
+        self.routes = routes
+        self._full_match = Match.FULL
+
+    def _route(self, scope) -> str:
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == self._full_match:
+                return route.path
+        return UNMATCHED_ROUTE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = self._route(scope)
+        method = scope["method"]
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc((route,))
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_LATENCY.observe((route, method), time.perf_counter() - start)
+            HTTP_REQUESTS.inc((route, method, status))
+            HTTP_IN_FLIGHT.dec((route,))
+
+
+# --- SQL ---
+# Known statements are reported by name, anything else by its first keyword
+QUERY_NAMES: Dict[str, str] = {}
+
+
+def name_queries(queries: Dict[str, str]):
+    QUERY_NAMES.update({sql: name for name, sql in queries.items()})
+
+
+def _query_label(sql: str) -> str:
+    name = QUERY_NAMES.get(sql)
+    if name is None:
+        words = sql.split(None, 1)
+        name = words[0].upper() if words else "EMPTY"
+    return name
+
+
+class TimedCursor(sqlite3.Cursor):
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            SQL_LATENCY.observe((_query_label(sql),), time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            SQL_LATENCY.observe((_query_label(sql),), time.perf_counter() - start)
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3 connection factory whose statements are timed into SQL_LATENCY."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    # Connection.execute builds a plain cursor internally, so route it through ours
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+# --- PokeAPI ---
+def observe_upstream(resource: str, outcome: str, seconds: float):
+    UPSTREAM_LATENCY.observe((resource, outcome), seconds)
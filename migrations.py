@@ -0,0 +1,147 @@
+# migrations.py
+import sqlite3
+import sys
+from typing import Dict, List, Tuple
+
+import read_tables
+import search
+
+DB_NAME = "pokemon_assessment.db"
+CLEANED_TABLES = ["pokemon", "types", "abilities", "trainers"]
+
+# (version, description, statements). Versions only ever grow; an applied
+# migration is never edited, a new one is appended instead.
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, "name indexes", [
+        # types.name and abilities.name are COLLATE NOCASE, so their
+        # indexes are case-insensitive too
+        "CREATE INDEX IF NOT EXISTS idx_types_name ON types (name)",
+        "CREATE INDEX IF NOT EXISTS idx_abilities_name ON abilities (name)",
+        "CREATE INDEX IF NOT EXISTS idx_pokemon_name ON pokemon (name)",
+        "CREATE INDEX IF NOT EXISTS idx_trainers_name ON trainers (name)",
+        "CREATE INDEX IF NOT EXISTS idx_pokemon_name_nocase ON pokemon (name COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_trainers_name_nocase ON trainers (name COLLATE NOCASE)",
+    ]),
+    (2, "trainer_pokemon_abilities covering indexes", [
+        "CREATE INDEX IF NOT EXISTS idx_tpa_pokemon ON trainer_pokemon_abilities (pokemon_id, ability_id, trainer_id)",
+        "CREATE INDEX IF NOT EXISTS idx_tpa_ability ON trainer_pokemon_abilities (ability_id, pokemon_id)",
+        "CREATE INDEX IF NOT EXISTS idx_tpa_trainer ON trainer_pokemon_abilities (trainer_id, pokemon_id)",
+    ]),
+    (3, "pokemon type indexes", [
+        "CREATE INDEX IF NOT EXISTS idx_pokemon_type1 ON pokemon (type1_id)",
+        "CREATE INDEX IF NOT EXISTS idx_pokemon_type2 ON pokemon (type2_id)",
+    ]),
+    (4, "dirty-row tracking for incremental cleaning", [
+        """CREATE TABLE IF NOT EXISTS clean_dirty (
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            PRIMARY KEY (table_name, row_id)
+        ) WITHOUT ROWID""",
+    ] + [
+        statement
+        for table_name in CLEANED_TABLES
+        for statement in (
+            f"""CREATE TRIGGER IF NOT EXISTS trg_{table_name}_dirty_insert AFTER INSERT ON {table_name}
+            BEGIN INSERT OR IGNORE INTO clean_dirty VALUES ('{table_name}', new.id); END""",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_{table_name}_dirty_rename AFTER UPDATE OF name ON {table_name}
+            BEGIN INSERT OR IGNORE INTO clean_dirty VALUES ('{table_name}', new.id); END""",
+            # rows already in the table have never been cleaned
+            f"INSERT OR IGNORE INTO clean_dirty SELECT '{table_name}', id FROM {table_name}",
+            # duplicate lookups for the dirty names only
+            f"CREATE INDEX IF NOT EXISTS idx_{table_name}_lower_name ON {table_name} (LOWER(name))",
+        )
+    ]),
+    (5, "roster rows of an ability in id order", [
+        # keyset pages (ability_id = ? AND id > ? ORDER BY id) without a sort
+        "CREATE INDEX IF NOT EXISTS idx_tpa_ability_order ON trainer_pokemon_abilities (ability_id, id, pokemon_id)",
+        "DROP INDEX IF EXISTS idx_tpa_ability",
+    ]),
+    (6, "app_meta with a data version counter", [
+        """CREATE TABLE IF NOT EXISTS app_meta (
+            key TEXT PRIMARY KEY,
+            value NOT NULL
+        )""",
+        "INSERT OR IGNORE INTO app_meta (key, value) VALUES ('data_version', 0)",
+    ]),
+    (7, "trigger-maintained read tables", read_tables.SCHEMA + read_tables.REBUILD),
+    (8, "FTS5 name search index", search.SCHEMA + search.REBUILD),
+]
+
+
+def _ensure_version_table(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )""")
+    conn.commit()
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    _ensure_version_table(conn)
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations").fetchone()[0]
+
+
+def apply_migrations(conn: sqlite3.Connection, migrations=MIGRATIONS) -> List[int]:
+    """
+    Apply every migration newer than the recorded schema version.
+    Each one runs in its own write transaction together with its
+    schema_migrations row, so a concurrent runner can never apply it twice.
+    Returns the versions applied by this call.
+    An up-to-date database is recognised with one read, without taking the lock.
+    """
+    _ensure_version_table(conn)
+    recorded = {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
+    applied = []
+    for version, description, statements in migrations:
+        # applied migrations are never removed, so they need no re-check under the lock
+        if version in recorded:
+            continue
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            done = conn.execute("SELECT 1 FROM schema_migrations WHERE version = ?", (version,)).fetchone()
+            if done is None:
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(
+                    "INSERT INTO schema_migrations (version, description) VALUES (?, ?)",
+                    (version, description))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        if done is None:
+            print(f"Applied migration {version}: {description}")
+            applied.append(version)
+    return applied
+
+
+def query_plan(conn: sqlite3.Connection, sql: str, params=()) -> List[str]:
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def full_scans(conn: sqlite3.Connection, sql: str, params=()) -> List[str]:
+    """Plan steps that read a whole table instead of going through an index."""
+    return [
+        step for step in query_plan(conn, sql, params)
+        if step.startswith("SCAN ") and "INDEX" not in step
+    ]
+
+
+def check_query_plans(conn: sqlite3.Connection, queries: Dict[str, Tuple[str, tuple]]) -> Dict[str, List[str]]:
+    """Return {query name: full table scans} for every query that does not use an index."""
+    problems = {}
+    for name, (sql, params) in queries.items():
+        scans = full_scans(conn, sql, params)
+        if scans:
+            problems[name] = scans
+    return problems
+
+
+if __name__ == "__main__":
+    db_name = sys.argv[1] if len(sys.argv) > 1 else DB_NAME
+    conn = sqlite3.connect(db_name)
+    applied = apply_migrations(conn)
+    print(f"Schema at version {schema_version(conn)} ({len(applied)} migration(s) applied)")
+    conn.close()
@@ -0,0 +1,335 @@
+# pokeapi.py
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+
+import metrics
+
+# httpx is imported where a request is actually made: cleaning with a fresh
+# vocabulary cache never needs it
+if TYPE_CHECKING:
+    import httpx
+
+# --- Constants ---
+POKEAPI_BASE_URL = os.environ.get("POKEAPI_BASE_URL", "https://pokeapi.co/api/v2").rstrip("/")
+POKEAPI_TIMEOUT = float(os.environ.get("POKEAPI_TIMEOUT", "10"))
+POKEAPI_OFFLINE = os.environ.get("POKEAPI_OFFLINE", "0") == "1"
+VOCABULARY_CACHE_DIR = os.environ.get("POKEAPI_CACHE_DIR", ".pokeapi_cache")
+VOCABULARY_CACHE_TTL = float(os.environ.get("POKEAPI_CACHE_TTL", str(24 * 3600)))
+POKEAPI_MAX_CONNECTIONS = int(os.environ.get("POKEAPI_MAX_CONNECTIONS", "20"))
+POKEAPI_MAX_CONCURRENCY = int(os.environ.get("POKEAPI_MAX_CONCURRENCY", "10"))
+POKEAPI_RETRIES = int(os.environ.get("POKEAPI_RETRIES", "3"))
+POKEAPI_BACKOFF = float(os.environ.get("POKEAPI_BACKOFF", "0.2"))
+POKEMON_CACHE_SIZE = int(os.environ.get("POKEAPI_POKEMON_CACHE_SIZE", "1024"))
+POKEMON_CACHE_TTL = float(os.environ.get("POKEAPI_POKEMON_CACHE_TTL", "3600"))
+POKEMON_NEGATIVE_TTL = float(os.environ.get("POKEAPI_POKEMON_NEGATIVE_TTL", "300"))
+BUNDLED_SNAPSHOT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pokeapi_snapshot.json")
+# offline vocabularies; generate_data.py writes ones that match its databases
+SNAPSHOT_FILE = os.environ.get("POKEAPI_SNAPSHOT_FILE", BUNDLED_SNAPSHOT_FILE)
+
+# vocabulary name -> list endpoint, relative to the base url
+VOCABULARIES = {
+    "pokemon": "pokemon?limit=500",
+    "types": "type?limit=500",
+    "abilities": "ability?limit=1000",
+}
+
+
+class VocabularyCache:
+    """
+    On-disk cache of the PokeAPI name lists used for spelling correction.
+
+    Each vocabulary is stored as JSON with the time it was fetched and the
+    ETag / Last-Modified validators of the response. Entries younger than the
+    TTL are used as they are; older ones are revalidated with a conditional
+    GET, so an unchanged list costs a 304. Stale vocabularies are refreshed
+    concurrently. When the API cannot be reached the stale entry is used,
+    then the bundled snapshot. In offline mode only the snapshot is read.
+    Names are returned exactly as PokeAPI spells them (lowercase, hyphenated).
+    """
+
+    def __init__(self, cache_dir: str = VOCABULARY_CACHE_DIR, ttl: float = VOCABULARY_CACHE_TTL,
+                 base_url: str = POKEAPI_BASE_URL, offline: bool = POKEAPI_OFFLINE,
+                 snapshot_file: Optional[str] = None, timeout: float = POKEAPI_TIMEOUT):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.base_url = base_url.rstrip("/")
+        self.offline = offline
+        self.snapshot_file = snapshot_file or SNAPSHOT_FILE
+        self.timeout = timeout
+        self._snapshot = None
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, f"{name}.json")
+
+    def _read(self, name: str) -> Optional[dict]:
+        try:
+            with open(self._path(name)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, name: str, entry: dict):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self._path(name) + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        # readers never see a half written file
+        os.replace(tmp_path, self._path(name))
+
+    def snapshot(self, name: str) -> List[str]:
+        if self._snapshot is None:
+            with open(self.snapshot_file) as f:
+                self._snapshot = json.load(f)
+        return list(self._snapshot[name])
+
+    def _is_fresh(self, entry: Optional[dict]) -> bool:
+        return entry is not None and time.time() - entry["fetched_at"] < self.ttl
+
+    async def _fetch(self, client: "httpx.AsyncClient", name: str, entry: Optional[dict]) -> List[str]:
+        import httpx
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            r = await client.get(f"{self.base_url}/{VOCABULARIES[name]}", headers=headers)
+            if r.status_code == 304 and entry is not None:
+                entry["fetched_at"] = time.time()
+                self._write(name, entry)
+                return entry["names"]
+            r.raise_for_status()
+            names = [item["name"] for item in r.json()["results"]]
+        except (httpx.HTTPError, ValueError, KeyError) as e:
+            if entry is not None:
+                print(f"PokeAPI {name} refresh failed ({e}); using cached copy")
+                return entry["names"]
+            print(f"PokeAPI {name} download failed ({e}); using bundled snapshot")
+            return self.snapshot(name)
+
+        self._write(name, {
+            "fetched_at": time.time(),
+            "etag": r.headers.get("ETag"),
+            "last_modified": r.headers.get("Last-Modified"),
+            "names": names,
+        })
+        return names
+
+    async def _refresh(self, stale: Dict[str, Optional[dict]]) -> Dict[str, List[str]]:
+        import httpx
+
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            names = await asyncio.gather(*(self._fetch(client, name, entry) for name, entry in stale.items()))
+        return dict(zip(stale, names))
+
+    def get(self, names: Iterable[str] = VOCABULARIES) -> Dict[str, List[str]]:
+        """Return {vocabulary name: [names]}, refreshing stale entries concurrently."""
+        names = list(names)
+        if self.offline:
+            return {name: self.snapshot(name) for name in names}
+
+        result = {}
+        stale = {}
+        for name in names:
+            entry = self._read(name)
+            if self._is_fresh(entry):
+                result[name] = entry["names"]
+            else:
+                stale[name] = entry
+        if stale:
+            result.update(asyncio.run(self._refresh(stale)))
+        return {name: result[name] for name in names}
+
+
+def parse_pokemon_data(data: dict) -> dict:
+    """Reduce a /pokemon/{name} payload to the fields the database stores."""
+    return {
+        "name": data["name"],
+        # types in order (primary, secondary)
+        "types": [
+            t["type"]["name"]
+            for t in sorted(data["types"], key=lambda x: x["slot"])
+        ],
+
+        # abilities
+        "abilities": [
+            {
+                "name": a["ability"]["name"],
+                "is_hidden": a["is_hidden"]
+            }
+            for a in data["abilities"]
+        ]
+    }
+
+
+class PokeAPIClient:
+    """
+    Async PokeAPI client sharing one keep-alive httpx.AsyncClient.
+
+    At most `max_concurrency` requests are in flight at once. Transport
+    errors, 429 and 5xx responses are retried with exponential backoff and
+    full jitter. A 404 raises ValueError and an upstream that stays
+    unavailable raises ConnectionError, the same errors get_pokemon_data uses.
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, base_url: str = POKEAPI_BASE_URL, timeout: float = POKEAPI_TIMEOUT,
+                 max_connections: int = POKEAPI_MAX_CONNECTIONS, max_concurrency: int = POKEAPI_MAX_CONCURRENCY,
+                 retries: int = POKEAPI_RETRIES, backoff: float = POKEAPI_BACKOFF):
+        self.base_url = base_url.rstrip("/")
+        self.retries = retries
+        self.backoff = backoff
+        import httpx
+
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _get(self, path: str) -> "httpx.Response":
+        import httpx
+
+        attempt = 0
+        resource = path.strip("/").split("/", 1)[0]
+        while True:
+            try:
+                async with self._semaphore:
+                    start = time.perf_counter()
+                    try:
+                        r = await self._client.get(path)
+                    except httpx.TransportError:
+                        metrics.observe_upstream(resource, "error", time.perf_counter() - start)
+                        raise
+                    metrics.observe_upstream(resource, str(r.status_code), time.perf_counter() - start)
+                if r.status_code not in self.RETRY_STATUSES or attempt >= self.retries:
+                    return r
+                error = f"HTTP {r.status_code}"
+            except httpx.TransportError as e:
+                if attempt >= self.retries:
+                    raise ConnectionError(f"Network error: {e}")
+                error = str(e)
+
+            delay = random.uniform(0, self.backoff * 2 ** attempt)
+            attempt += 1
+            print(f"PokeAPI GET {path} failed ({error}); retry {attempt} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    async def get_pokemon_data(self, pokemon_name: str) -> dict:
+        r = await self._get(f"/pokemon/{pokemon_name.lower()}")
+        if r.status_code == 404:
+            raise ValueError(f"Pokemon '{pokemon_name}' not found")
+        if r.status_code >= 400:
+            raise ConnectionError(f"PokeAPI returned HTTP {r.status_code}")
+        return parse_pokemon_data(r.json())
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+class PokemonDataCache:
+    """
+    Lookup layer in front of PokeAPIClient.get_pokemon_data, with the same interface.
+
+    Concurrent lookups of one name share a single upstream call. Results
+    are kept in an LRU of `max_entries` names: pokemon for `ttl` seconds,
+    names PokeAPI does not know (404) for the shorter `negative_ttl`.
+    Upstream failures are never cached. Hits, misses, negative hits and
+    coalesced lookups are counted in metrics.POKEAPI_CACHE.
+    """
+
+    def __init__(self, client: PokeAPIClient, max_entries: int = POKEMON_CACHE_SIZE,
+                 ttl: float = POKEMON_CACHE_TTL, negative_ttl: float = POKEMON_NEGATIVE_TTL):
+        self.client = client
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        # lowercased name -> (expires at, parsed data or None when not found)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    def _store(self, key: str, data: Optional[dict], ttl: float):
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, data)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _fetch(self, key: str, pokemon_name: str) -> dict:
+        try:
+            data = await self.client.get_pokemon_data(pokemon_name)
+        except ValueError:
+            self._store(key, None, self.negative_ttl)
+            raise
+        self._store(key, data, self.ttl)
+        return data
+
+    def _forget(self, key: str, task: asyncio.Future):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+    async def get_pokemon_data(self, pokemon_name: str) -> dict:
+        key = pokemon_name.lower()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                if entry[1] is None:
+                    metrics.POKEAPI_CACHE.inc(("negative_hit",))
+                    raise ValueError(f"Pokemon '{pokemon_name}' not found")
+                metrics.POKEAPI_CACHE.inc(("hit",))
+                return entry[1]
+            del self._entries[key]
+
+        task = self._in_flight.get(key)
+        if task is None:
+            metrics.POKEAPI_CACHE.inc(("miss",))
+            task = self._in_flight[key] = asyncio.ensure_future(self._fetch(key, pokemon_name))
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            metrics.POKEAPI_CACHE.inc(("coalesced",))
+        # a caller that goes away must not cancel the lookup the others wait on
+        return await asyncio.shield(task)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+def load_vocabularies(names: Iterable[str] = VOCABULARIES) -> Dict[str, List[str]]:
+    return VocabularyCache().get(names)
+
+
+def write_snapshot(path: str = BUNDLED_SNAPSHOT_FILE):
+    """Download every vocabulary and store it as the bundled offline snapshot."""
+    import httpx
+
+    cache = VocabularyCache(ttl=0)
+    snapshot = {}
+    with httpx.Client(timeout=cache.timeout) as client:
+        for name, endpoint in VOCABULARIES.items():
+            r = client.get(f"{cache.base_url}/{endpoint}")
+            r.raise_for_status()
+            snapshot[name] = [item["name"] for item in r.json()["results"]]
+    with open(path, "w") as f:
+        json.dump(snapshot, f, indent=1)
+        f.write("\n")
+    print(f"Snapshot written to '{path}'")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["snapshot"]:
+        write_snapshot()
+    else:
+        print("usage: python pokeapi.py snapshot")
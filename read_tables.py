@@ -0,0 +1,193 @@
+# read_tables.py
+"""
+Denormalized read tables behind the GET endpoints.
+
+    pokemon_read  one row per pokemon: name and type names (type lookups)
+    roster_read   one row per trainer_pokemon_abilities row whose pokemon,
+                  ability and trainer all exist: their names (every other lookup)
+
+Triggers on the base tables keep both up to date row by row. A full clean
+rewrites most rows, so clean_database pauses the triggers (app_meta
+read_tables_live = 0) and rebuilds both tables in one statement each when it
+is done, all in its one transaction; a paused state left behind anyway is
+repaired at startup.
+
+    python read_tables.py check [db]
+    python read_tables.py rebuild [db]
+"""
+import sqlite3
+import sys
+from typing import Dict
+
+DB_NAME = "pokemon_assessment.db"
+
+POKEMON_SELECT = """
+    SELECT pk.id, pk.name, pk.type1_id, pk.type2_id, t1.name, t2.name
+    FROM pokemon pk
+        LEFT JOIN types t1 ON t1.id = pk.type1_id
+        LEFT JOIN types t2 ON t2.id = pk.type2_id """
+
+ROSTER_SELECT = """
+    SELECT tpa.id, tpa.pokemon_id, tpa.ability_id, tpa.trainer_id, pk.name, ab.name, tr.name
+    FROM trainer_pokemon_abilities tpa
+        INNER JOIN pokemon pk ON pk.id = tpa.pokemon_id
+        INNER JOIN abilities ab ON ab.id = tpa.ability_id
+        INNER JOIN trainers tr ON tr.id = tpa.trainer_id """
+
+POKEMON_COLUMNS = "pokemon_id, name, type1_id, type2_id, type1_name, type2_name"
+ROSTER_COLUMNS = "tpa_id, pokemon_id, ability_id, trainer_id, pokemon_name, ability_name, trainer_name"
+
+LIVE = "(SELECT value FROM app_meta WHERE key = 'read_tables_live') = 1"
+
+
+def _trigger(name: str, event: str, body: str) -> str:
+    return f"""CREATE TRIGGER IF NOT EXISTS trg_{name} AFTER {event}
+        WHEN {LIVE}
+        BEGIN {body} END"""
+
+
+def _refresh_roster(where: str) -> str:
+    return f"INSERT OR REPLACE INTO roster_read ({ROSTER_COLUMNS}) {ROSTER_SELECT} WHERE {where};"
+
+
+def _refresh_pokemon(where: str) -> str:
+    return f"INSERT OR REPLACE INTO pokemon_read ({POKEMON_COLUMNS}) {POKEMON_SELECT} WHERE {where};"
+
+
+# Name columns carry the collation of the base column they copy, so lookups
+# compare exactly as the old joins did
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS pokemon_read (
+        pokemon_id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        type1_id INTEGER,
+        type2_id INTEGER,
+        type1_name TEXT COLLATE NOCASE,
+        type2_name TEXT COLLATE NOCASE
+    )""",
+    """CREATE TABLE IF NOT EXISTS roster_read (
+        tpa_id INTEGER PRIMARY KEY,
+        pokemon_id INTEGER NOT NULL,
+        ability_id INTEGER NOT NULL,
+        trainer_id INTEGER NOT NULL,
+        pokemon_name TEXT NOT NULL,
+        ability_name TEXT NOT NULL COLLATE NOCASE,
+        trainer_name TEXT NOT NULL
+    )""",
+    # lookups
+    "CREATE INDEX IF NOT EXISTS idx_pokemon_read_type1 ON pokemon_read (type1_name)",
+    "CREATE INDEX IF NOT EXISTS idx_pokemon_read_type2 ON pokemon_read (type2_name)",
+    "CREATE INDEX IF NOT EXISTS idx_roster_read_ability ON roster_read (ability_name, tpa_id, pokemon_name)",
+    "CREATE INDEX IF NOT EXISTS idx_roster_read_pokemon ON roster_read (pokemon_name, tpa_id, ability_name, trainer_name)",
+    # trigger maintenance
+    "CREATE INDEX IF NOT EXISTS idx_pokemon_read_type1_id ON pokemon_read (type1_id)",
+    "CREATE INDEX IF NOT EXISTS idx_pokemon_read_type2_id ON pokemon_read (type2_id)",
+    "CREATE INDEX IF NOT EXISTS idx_roster_read_pokemon_id ON roster_read (pokemon_id)",
+    "CREATE INDEX IF NOT EXISTS idx_roster_read_ability_id ON roster_read (ability_id)",
+    "CREATE INDEX IF NOT EXISTS idx_roster_read_trainer_id ON roster_read (trainer_id)",
+    "INSERT OR IGNORE INTO app_meta (key, value) VALUES ('read_tables_live', 1)",
+
+    _trigger("pokemon_read_insert", "INSERT ON pokemon",
+             _refresh_pokemon("pk.id = new.id") + _refresh_roster("tpa.pokemon_id = new.id")),
+    _trigger("pokemon_read_update", "UPDATE OF name, type1_id, type2_id ON pokemon",
+             _refresh_pokemon("pk.id = new.id")
+             + "UPDATE roster_read SET pokemon_name = new.name WHERE pokemon_id = new.id;"),
+    _trigger("pokemon_read_delete", "DELETE ON pokemon",
+             "DELETE FROM pokemon_read WHERE pokemon_id = old.id;"
+             "DELETE FROM roster_read WHERE pokemon_id = old.id;"),
+
+    _trigger("types_read_insert", "INSERT ON types",
+             "UPDATE pokemon_read SET type1_name = new.name WHERE type1_id = new.id;"
+             "UPDATE pokemon_read SET type2_name = new.name WHERE type2_id = new.id;"),
+    _trigger("types_read_update", "UPDATE OF name ON types",
+             "UPDATE pokemon_read SET type1_name = new.name WHERE type1_id = new.id;"
+             "UPDATE pokemon_read SET type2_name = new.name WHERE type2_id = new.id;"),
+    _trigger("types_read_delete", "DELETE ON types",
+             "UPDATE pokemon_read SET type1_name = NULL WHERE type1_id = old.id;"
+             "UPDATE pokemon_read SET type2_name = NULL WHERE type2_id = old.id;"),
+
+    _trigger("abilities_read_insert", "INSERT ON abilities", _refresh_roster("tpa.ability_id = new.id")),
+    _trigger("abilities_read_update", "UPDATE OF name ON abilities",
+             "UPDATE roster_read SET ability_name = new.name WHERE ability_id = new.id;"),
+    _trigger("abilities_read_delete", "DELETE ON abilities", "DELETE FROM roster_read WHERE ability_id = old.id;"),
+
+    _trigger("trainers_read_insert", "INSERT ON trainers", _refresh_roster("tpa.trainer_id = new.id")),
+    _trigger("trainers_read_update", "UPDATE OF name ON trainers",
+             "UPDATE roster_read SET trainer_name = new.name WHERE trainer_id = new.id;"),
+    _trigger("trainers_read_delete", "DELETE ON trainers", "DELETE FROM roster_read WHERE trainer_id = old.id;"),
+
+    _trigger("tpa_read_insert", "INSERT ON trainer_pokemon_abilities", _refresh_roster("tpa.id = new.id")),
+    _trigger("tpa_read_update", "UPDATE ON trainer_pokemon_abilities",
+             "DELETE FROM roster_read WHERE tpa_id = old.id;" + _refresh_roster("tpa.id = new.id")),
+    _trigger("tpa_read_delete", "DELETE ON trainer_pokemon_abilities", "DELETE FROM roster_read WHERE tpa_id = old.id;"),
+]
+
+REBUILD = [
+    "DELETE FROM pokemon_read",
+    "DELETE FROM roster_read",
+    f"INSERT INTO pokemon_read ({POKEMON_COLUMNS}) {POKEMON_SELECT}",
+    f"INSERT INTO roster_read ({ROSTER_COLUMNS}) {ROSTER_SELECT}",
+    "UPDATE app_meta SET value = 1 WHERE key = 'read_tables_live'",
+]
+
+
+def pause_read_tables(conn: sqlite3.Connection):
+    """
+    Stop trigger maintenance until the next rebuild (for bulk rewrites).
+    Runs inside the caller's transaction, like refresh_read_tables.
+    """
+    conn.execute("UPDATE app_meta SET value = 0 WHERE key = 'read_tables_live'")
+
+
+def read_tables_live(conn: sqlite3.Connection) -> bool:
+    row = conn.execute("SELECT value FROM app_meta WHERE key = 'read_tables_live'").fetchone()
+    return row is not None and row[0] == 1
+
+
+def refresh_read_tables(conn: sqlite3.Connection):
+    """Repopulate both read tables and resume the triggers, inside the caller's transaction."""
+    for statement in REBUILD:
+        conn.execute(statement)
+
+
+def rebuild_read_tables(conn: sqlite3.Connection):
+    """Repopulate both read tables from the base tables and resume the triggers."""
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        refresh_read_tables(conn)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def check_read_tables(conn: sqlite3.Connection) -> Dict[str, int]:
+    """
+    Compare the read tables with what the base tables say they should hold.
+    Returns {"<table> missing": n, "<table> extra": n}; all zeros means consistent.
+    """
+    problems = {}
+    for table_name, columns, select in (("pokemon_read", POKEMON_COLUMNS, POKEMON_SELECT),
+                                        ("roster_read", ROSTER_COLUMNS, ROSTER_SELECT)):
+        stored = f"SELECT {columns} FROM {table_name}"
+        problems[f"{table_name} missing"] = conn.execute(
+            f"SELECT COUNT(*) FROM ({select} EXCEPT {stored})").fetchone()[0]
+        problems[f"{table_name} extra"] = conn.execute(
+            f"SELECT COUNT(*) FROM ({stored} EXCEPT {select})").fetchone()[0]
+    return problems
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    conn = sqlite3.connect(sys.argv[2] if len(sys.argv) > 2 else DB_NAME)
+    if command == "rebuild":
+        rebuild_read_tables(conn)
+        print("Read tables rebuilt")
+    elif command == "check":
+        problems = check_read_tables(conn)
+        for name, count in problems.items():
+            print(f"{name}: {count}")
+        sys.exit(1 if any(problems.values()) else 0)
+    else:
+        print("usage: python read_tables.py check|rebuild [db]")
+    conn.close()
@@ -0,0 +1,15 @@
+# schemas.py
+"""Request bodies of the API; imported with FastAPI, so the cleaning path never loads pydantic."""
+from typing import Annotated, List, Literal
+
+from pydantic import BaseModel, Field
+
+
+class RosterEntry(BaseModel):
+    pokemon: str = Field(..., min_length=1, max_length=30, pattern="^[A-Za-z-]+$")
+    trainer: str = Field(..., min_length=1, max_length=30, pattern="^[A-Za-z-]+$")
+
+
+class PokemonLookup(BaseModel):
+    pokemon: List[Annotated[str, Field(min_length=1, max_length=30, pattern="^[A-Za-z-]+$")]]
+    include: List[Literal["abilities", "trainers"]] = ["abilities", "trainers"]
@@ -0,0 +1,187 @@
+# search.py
+"""
+Full-text name search over pokemon, types, abilities and trainers.
+
+name_search is an FTS5 table with one row per base-table row; its rowid is
+id * 4 + the table's code, so triggers can update and delete the exact row.
+Lookups are phrase-prefix matches ranked with bm25; prefix indexes keep
+short prefixes cheap on millions of names, and one- or two-letter queries
+skip the ranking. When a query matches nothing,
+each word is checked against the index vocabulary (fts5vocab) and the
+closest known prefixes are tried instead.
+
+    python search.py rebuild [db]
+    python search.py query <text> [db]
+"""
+import re
+import sqlite3
+import sys
+from difflib import get_close_matches
+from typing import Dict, List, Optional, Tuple
+
+DB_NAME = "pokemon_assessment.db"
+
+# table -> (rowid code, kind reported to clients)
+KINDS = {
+    "pokemon": (0, "pokemon"),
+    "types": (1, "type"),
+    "abilities": (2, "ability"),
+    "trainers": (3, "trainer"),
+}
+SUGGESTIONS_PER_WORD = 3
+SUGGESTION_CUTOFF = 0.7
+# ranked rows fetched per requested result; duplicate names in uncleaned data collapse
+OVERFETCH = 3
+# shorter queries match too much of a large index to rank it all; they
+# come back in index (id) order instead
+RANKED_MIN_LENGTH = 3
+
+
+def _triggers(table_name: str) -> List[str]:
+    code, kind = KINDS[table_name]
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table_name}_search_insert AFTER INSERT ON {table_name}
+            BEGIN INSERT INTO name_search (rowid, name, kind) VALUES (new.id * 4 + {code}, new.name, '{kind}'); END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table_name}_search_update AFTER UPDATE OF name ON {table_name}
+            BEGIN UPDATE name_search SET name = new.name WHERE rowid = new.id * 4 + {code}; END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table_name}_search_delete AFTER DELETE ON {table_name}
+            BEGIN DELETE FROM name_search WHERE rowid = old.id * 4 + {code}; END""",
+    ]
+
+
+SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS name_search USING fts5(
+        name, kind, prefix = '1 2 3', tokenize = 'unicode61 remove_diacritics 2')""",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS name_search_vocab USING fts5vocab(name_search, col)",
+] + [trigger for table_name in KINDS for trigger in _triggers(table_name)]
+
+REBUILD = ["DELETE FROM name_search"] + [
+    f"INSERT INTO name_search (rowid, name, kind) SELECT id * 4 + {code}, name, '{kind}' FROM {table_name}"
+    for table_name, (code, kind) in KINDS.items()
+] + ["INSERT INTO name_search (name_search) VALUES ('optimize')"]
+
+SEARCH_SQL = """
+    SELECT name, kind FROM name_search
+    WHERE name_search MATCH ?
+    ORDER BY rank
+    LIMIT ? """
+
+UNRANKED_SEARCH_SQL = """
+    SELECT name, kind FROM name_search
+    WHERE name_search MATCH ?
+    LIMIT ? """
+
+VOCAB_SQL = """
+    SELECT term FROM name_search_vocab
+    WHERE col = 'name' AND term >= ? AND term < ? """
+
+
+def words(query: str) -> List[str]:
+    """The query as index terms: lowercase runs of letters and digits, like unicode61."""
+    return re.findall(r"[^\W_]+", query.lower())
+
+
+def _match(phrase: List[str], kind: Optional[str]) -> str:
+    # one phrase, the last word a prefix: "ash ket" finds "Ash Ketchum".
+    # words hold only letters and digits, so user input is never FTS5 syntax
+    expression = 'name : ("' + " ".join(phrase) + '" *)'
+    if kind is not None:
+        expression += f' AND kind : "{kind}"'
+    return expression
+
+
+def _collect(conn: sqlite3.Connection, phrase: List[str], kind: Optional[str], limit: int,
+             results: List[Dict[str, str]], seen: set):
+    sql = SEARCH_SQL if len("".join(phrase)) >= RANKED_MIN_LENGTH else UNRANKED_SEARCH_SQL
+    for name, row_kind in conn.execute(sql, (_match(phrase, kind), limit * OVERFETCH)):
+        key = (row_kind, name.lower())
+        if key not in seen:
+            seen.add(key)
+            results.append({"name": name, "kind": row_kind})
+            if len(results) >= limit:
+                break
+
+
+def suggest_prefixes(conn: sqlite3.Connection, word: str, n: int = SUGGESTIONS_PER_WORD,
+                     cutoff: float = SUGGESTION_CUTOFF) -> List[str]:
+    """
+    Known prefixes closest to `word`, best first, from index terms sharing
+    its first letter (so only that slice of the vocabulary is read).
+    Whole terms compete with their prefixes, so a misspelt complete word
+    ("blze") prefers the word it was meant to be ("blaze").
+    """
+    candidates = {}
+    for (term,) in conn.execute(VOCAB_SQL, (word[0], word[0] + "\U0010ffff")):
+        candidates.setdefault(term, None)
+        candidates.setdefault(term[:len(word)], None)
+    return get_close_matches(word, list(candidates), n, cutoff)
+
+
+def search_names(conn: sqlite3.Connection, query: str, limit: int = 20,
+                 kind: Optional[str] = None) -> Tuple[List[Dict[str, str]], bool]:
+    """
+    Names starting with the words of `query`, best (bm25) first, an exact name on top.
+    Returns (results, fuzzy); fuzzy is True when the results come from
+    spelling suggestions because the query itself matched nothing.
+    """
+    query_words = words(query)
+    if not query_words:
+        return [], False
+
+    results, seen = [], set()
+    _collect(conn, query_words, kind, limit, results, seen)
+    if results:
+        exact = " ".join(query_words)
+        results.sort(key=lambda result: " ".join(words(result["name"])) != exact)
+        return results, False
+
+    # closest spellings for the words the index does not know, best first
+    suggestions = []
+    for word in query_words:
+        known = conn.execute(VOCAB_SQL + " LIMIT 1", (word, word + "\U0010ffff")).fetchone()
+        suggestions.append([word] if known else suggest_prefixes(conn, word))
+        if not suggestions[-1]:
+            return [], True
+
+    # the best guess for every word, then one word at a time swapped for its next guess
+    best = [options[0] for options in suggestions]
+    phrases = [best] + [
+        best[:i] + [option] + best[i + 1:]
+        for i, options in enumerate(suggestions) for option in options[1:]
+    ]
+    for phrase in phrases:
+        _collect(conn, phrase, kind, limit, results, seen)
+        if len(results) >= limit:
+            break
+    return results, True
+
+
+def rebuild_search(conn: sqlite3.Connection):
+    """Re-index every name from the base tables."""
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        for statement in REBUILD:
+            conn.execute(statement)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "rebuild":
+        conn = sqlite3.connect(sys.argv[2] if len(sys.argv) > 2 else DB_NAME)
+        rebuild_search(conn)
+        print("Search index rebuilt")
+    elif command == "query" and len(sys.argv) > 2:
+        conn = sqlite3.connect(sys.argv[3] if len(sys.argv) > 3 else DB_NAME)
+        results, fuzzy = search_names(conn, sys.argv[2])
+        for result in results:
+            print(f"{result['kind']:<8} {result['name']}")
+        if fuzzy:
+            print("(no exact match; showing spelling suggestions)")
+    else:
+        print("usage: python search.py rebuild [db] | query <text> [db]")
+        sys.exit(1)
+    conn.close()
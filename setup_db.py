@@ -4,15 +4,8 @@ import os
 DB_NAME = "pokemon_assessment.db"
 
 
-def setup_database():
-    """Creates and populates the SQLite database with dirty data."""
-    if os.path.exists(DB_NAME):
-        os.remove(DB_NAME)  # Start fresh each time
-
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-
-    # --- Create Tables ---
+def create_schema(cursor: sqlite3.Cursor):
+    """Creates the (index-free) tables the assessment database starts with."""
     cursor.execute("""
     CREATE TABLE types (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -53,6 +46,17 @@ def setup_database():
     );
     """)
 
+
+def setup_database():
+    """Creates and populates the SQLite database with dirty data."""
+    if os.path.exists(DB_NAME):
+        os.remove(DB_NAME)  # Start fresh each time
+
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+
+    create_schema(cursor)
+
     # --- Populate with Dirty Data ---
     # Types (duplicates, inconsistent casing, misspellings)
     types_data = [
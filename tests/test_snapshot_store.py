@@ -0,0 +1,51 @@
+# tests/test_snapshot_store.py
+"""SnapshotStore must serve a WAL-mode database, the journal mode the server switches to."""
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from candidate_solution import SnapshotStore  # noqa: E402
+
+
+def make_wal_database(path: str):
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA journal_mode = wal").fetchone()[0] == "wal"
+    conn.execute("CREATE TABLE app_meta (key TEXT PRIMARY KEY, value INTEGER)")
+    conn.execute("INSERT INTO app_meta (key, value) VALUES ('data_version', 1)")
+    conn.execute("CREATE TABLE pokemon (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.execute("INSERT INTO pokemon (name) VALUES ('Pikachu')")
+    conn.commit()
+    return conn
+
+
+def test_snapshot_of_wal_database(tmp_path):
+    db_name = str(tmp_path / "wal.db")
+    writer = make_wal_database(db_name)
+    store = SnapshotStore(db_name, size=2, poll_interval=0.05)
+    store.start()
+    try:
+        assert store.current() == 1
+        with store.connection() as conn:
+            assert conn.execute("SELECT name FROM pokemon").fetchall() == [("Pikachu",)]
+
+        # a commit from another connection is picked up by the refresher
+        writer.execute("INSERT INTO pokemon (name) VALUES ('Eevee')")
+        writer.execute("UPDATE app_meta SET value = 2 WHERE key = 'data_version'")
+        writer.commit()
+        deadline = time.monotonic() + 5
+        while store.current() != 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert store.current() == 2
+        with store.connection() as conn:
+            assert conn.execute("SELECT name FROM pokemon ORDER BY id").fetchall() == [("Pikachu",), ("Eevee",)]
+    finally:
+        store.close()
+        writer.close()
+
+    # the source file itself stays in WAL mode
+    conn = sqlite3.connect(db_name)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    conn.close()